@@ -4,13 +4,14 @@ from __future__ import annotations
 from logging.config import fileConfig
 import sys, pathlib
 from alembic import context
-from sqlalchemy import engine_from_config, pool
+from sqlalchemy import engine_from_config
 
 # Ensure fastapi/ is on sys.path
 sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
 
-# Import ONLY what's needed (avoid importing app.core top-level side-effects)
-from app.models.user import Base
+# app.models imports every model module, so Base.metadata is complete for
+# autogenerate. It also imports app.db, which builds the app engine (no connection yet).
+from app.models import Base
 from app.core.config import get_settings
 
 config = context.config
@@ -37,10 +38,10 @@ def run_migrations_offline() -> None:
         context.run_migrations()
 
 def run_migrations_online() -> None:
+    # default pool: migrations run on the single connection opened below either way
     connectable = engine_from_config(
         config.get_section(config.config_ini_section),
         prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
     )
 
     with connectable.connect() as connection:
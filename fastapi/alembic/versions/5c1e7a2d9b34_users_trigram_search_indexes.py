@@ -0,0 +1,48 @@
+# Path from repo root: fastapi\alembic\versions\5c1e7a2d9b34_users_trigram_search_indexes.py
+
+"""users trigram search indexes
+
+Revision ID: 5c1e7a2d9b34
+Revises: ace6bf99550a
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1e7a2d9b34'
+down_revision: Union[str, Sequence[str], None] = 'ace6bf99550a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# GIN trigram indexes let `ILIKE '%term%'` (GET /users?q=) use an index on Postgres.
+# Other backends have no equivalent and keep the sequential scan.
+_INDEXES = {"username": "ix_users_username_trgm", "email": "ix_users_email_trgm"}
+
+
+def _columns() -> set[str]:
+    return {c["name"] for c in sa.inspect(op.get_bind()).get_columns("users")}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    cols = _columns()
+    for col, name in _INDEXES.items():
+        if col in cols:
+            op.create_index(name, "users", [col], postgresql_using="gin",
+                            postgresql_ops={col: "gin_trgm_ops"})
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for name in _INDEXES.values():
+        op.execute(f"DROP INDEX IF EXISTS {name}")
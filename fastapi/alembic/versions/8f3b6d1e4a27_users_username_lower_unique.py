@@ -0,0 +1,34 @@
+# Path from repo root: fastapi\alembic\versions\8f3b6d1e4a27_users_username_lower_unique.py
+
+"""users lower(username) unique index
+
+Revision ID: 8f3b6d1e4a27
+Revises: 5c1e7a2d9b34
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3b6d1e4a27'
+down_revision: Union[str, Sequence[str], None] = '5c1e7a2d9b34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Functional unique index: usernames differing only by case ("Alice" / "alice")
+# can't both exist. Fails if such pairs are already in the table; rename one first.
+_INDEX = "uq_users_username_lower"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(_INDEX, "users", [sa.text("lower(username)")], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(_INDEX, table_name="users")
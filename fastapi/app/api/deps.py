@@ -3,22 +3,24 @@
 from __future__ import annotations
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer
-import jwt, os
-from typing import Annotated, List
+from typing import Annotated, FrozenSet
+from app.core.security import decode_token
+from app.db import get_db  # noqa: F401  (the one request-scoped Session dependency)
 
-JWT_SECRET = os.getenv("APP_JWT_SECRET", "changeme")
 security = HTTPBearer()
 
-def current_user_roles(token=Depends(security)) -> List[str]:
+def current_user_roles(token=Depends(security)) -> FrozenSet[str]:
     try:
-        payload = jwt.decode(token.credentials, JWT_SECRET, algorithms=["HS256"])
-        return payload.get("roles", [])
+        payload = decode_token(token.credentials)
+        return frozenset(payload.get("roles", ()))
     except Exception:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
 def require_roles(*needed: str):
-    def wrapper(roles: List[str] = Depends(current_user_roles)):
-        if any(r for r in roles if r in needed) or "admin" in roles:
+    # built once per route; admin always passes
+    allowed = frozenset(needed) | {"admin"}
+    def wrapper(roles: FrozenSet[str] = Depends(current_user_roles)):
+        if not allowed.isdisjoint(roles):
             return True
         raise HTTPException(status_code=403, detail="Forbidden")
     return wrapper
\ No newline at end of file
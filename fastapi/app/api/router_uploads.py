@@ -3,16 +3,23 @@ from __future__ import annotations
 
 import hashlib
 import mimetypes
+import os
 import re
+import shutil
+import stat
+import time
+import uuid
+from functools import lru_cache
 from pathlib import Path
 from typing import Annotated, Literal
 
 from fastapi import APIRouter, File, HTTPException, UploadFile, status
 from fastapi.responses import FileResponse
 from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
 
 from app.core.config import get_settings
-from app.core.path_utils import as_path
+from app.core.responses import OrjsonResponse
 
 router = APIRouter(prefix="/uploads", tags=["uploads"])
 
@@ -40,46 +47,62 @@ class ListResult(BaseModel):
 
 # ---------- Setup / Helpers ----------
 settings = get_settings()
-UPLOAD_ROOT: Path = as_path(settings.UPLOAD_DIR).resolve()
+UPLOAD_ROOT: Path = settings.UPLOAD_DIR.resolve()
 UPLOAD_ROOT.mkdir(parents=True, exist_ok=True)
 
 # Max file size (in MB) from settings
 MAX_MB: int = int(getattr(settings, "UPLOAD_MAX_MB", 25))
+MAX_BYTES: int = MAX_MB * 1024 * 1024
+
+# Uploads are streamed in chunks of this size into a staging dir, then moved into place.
+CHUNK_SIZE: int = 1 << 20  # 1 MB
+PARTIAL_ROOT: Path = UPLOAD_ROOT / ".partial"
+# Content-addressed store: one copy per sha256, user-facing names are hard links to it.
+CAS_ROOT: Path = UPLOAD_ROOT / ".cas"
 
 # Categories supported. Key = category folder under uploads/.
-# Value = tuple: (predicate over content-type, human name)
+# Value = content-type pattern (matched from the start of the string), in priority order.
 Category = Literal["pdf", "image", "audio", "video", "text", "archive", "other"]
-CATEGORY_RULES: list[tuple[Category, re.Pattern[str]]] = [
-    ("pdf", re.compile(r"^application/(pdf|x-pdf|acrobat)$")),
-    ("image", re.compile(r"^image/")),
-    ("audio", re.compile(r"^audio/")),
-    ("video", re.compile(r"^video/")),
-    ("text", re.compile(r"^(text/|application/(json|xml|csv))")),
-    ("archive", re.compile(r"^application/(zip|x-7z-compressed|x-rar-compressed|x-tar|x-gzip|x-bzip2|x-xz)$")),
+CATEGORY_RULES: list[tuple[Category, str]] = [
+    ("pdf", r"application/(?:pdf|x-pdf|acrobat)$"),
+    ("image", r"image/"),
+    ("audio", r"audio/"),
+    ("video", r"video/"),
+    ("text", r"(?:text/|application/(?:json|xml|csv))"),
+    ("archive", r"application/(?:zip|x-7z-compressed|x-rar-compressed|x-tar|x-gzip|x-bzip2|x-xz)$"),
 ]
+# All rules fused into one anchored alternation; the named group that matched is the category.
+_CATEGORY_RX: re.Pattern[str] = re.compile(
+    "^(?:" + "|".join(f"(?P<{cat}>{rx})" for cat, rx in CATEGORY_RULES) + ")"
+)
+
+# Fallback by file extension when the content type is missing/unknown.
+_EXT2CAT: dict[str, Category] = {
+    ext: cat
+    for cat, exts in (
+        ("pdf", (".pdf",)),
+        ("image", (".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp", ".tiff", ".svg")),
+        ("audio", (".mp3", ".wav", ".flac", ".m4a", ".ogg", ".oga")),
+        ("video", (".mp4", ".mkv", ".mov", ".webm", ".avi")),
+        ("text", (".txt", ".md", ".json", ".xml", ".csv", ".tsv")),
+        ("archive", (".zip", ".7z", ".rar", ".tar", ".gz", ".bz2", ".xz")),
+        ("docs", (".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx")),
+    )
+    for ext in exts
+}
 
 def _category_from_ct(content_type: str | None, filename: str | None) -> Category:
     ct = (content_type or "").lower().strip()
-    for cat, rx in CATEGORY_RULES:
-        if rx.match(ct):
-            return cat
-    # fallback heuristics by extension
-    suffix = (Path(filename or "").suffix.lower())
-    if suffix == ".pdf":
-        return "pdf"
-    if suffix in {".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp", ".tiff", ".svg"}:
-        return "image"
-    if suffix in {".mp3", ".wav", ".flac", ".m4a", ".ogg", ".oga"}:
-        return "audio"
-    if suffix in {".mp4", ".mkv", ".mov", ".webm", ".avi"}:
-        return "video"
-    if suffix in {".txt", ".md", ".json", ".xml", ".csv", ".tsv"}:
-        return "text"
-    if suffix in {".zip", ".7z", ".rar", ".tar", ".gz", ".bz2", ".xz"}:
-        return "archive"
-    if suffix in {".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx"}:
-        return "docs"
-    return "other"
+    m = _CATEGORY_RX.match(ct)
+    if m:
+        return m.lastgroup  # type: ignore[return-value]
+    return _EXT2CAT.get(os.path.splitext(filename or "")[1].lower(), "other")
+
+
+@lru_cache(maxsize=256)
+def _mime_for(suffix: str) -> str:
+    """Content type for a lowercased extension (".pdf"); unknown -> octet-stream."""
+    return mimetypes.guess_type("x" + suffix)[0] or "application/octet-stream"
 
 
 def _ensure_dir(p: Path) -> None:
@@ -88,14 +111,27 @@ def _ensure_dir(p: Path) -> None:
 def _safe_dst(root: Path, name: str | None) -> Path:
     """
     Return a safe path inside the given root, preventing path traversal.
+    UPLOAD_ROOT is resolved once at import, so this is pure string work
+    (no resolve()/readlink walk per request).
     """
-    safe_name = Path(name or "upload.bin").name
-    dst = (root / safe_name).resolve()
-    try:
-        dst.relative_to(root)
-    except ValueError:
+    root_str = os.path.join(str(root), "")
+    dst_str = os.path.normpath(os.path.join(root_str, Path(name or "upload.bin").name))
+    if not dst_str.startswith(root_str):
         raise HTTPException(status_code=400, detail="Invalid path")
-    return dst
+    return Path(dst_str)
+
+def _stat_regular_file(dst: Path) -> os.stat_result:
+    """
+    Single stat() for downloads; the result is handed to FileResponse so
+    Starlette doesn't stat again before streaming the file.
+    """
+    try:
+        st = os.stat(dst)
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=404, detail="File not found")
+    if not stat.S_ISREG(st.st_mode):
+        raise HTTPException(status_code=404, detail="File not found")
+    return st
 
 def _dedupe_path(dst: Path) -> Path:
     """
@@ -112,6 +148,89 @@ def _dedupe_path(dst: Path) -> Path:
             return candidate
         i += 1
 
+@lru_cache(maxsize=64)
+def _scan_files(root: str, mtime_ns: int, suffix: str | None = None) -> tuple[tuple[str, int], ...]:
+    """
+    One os.scandir pass over `root` -> ((name, size), ...). DirEntry caches the
+    d_type from readdir, so is_file() costs no extra syscall. Keyed on the
+    directory mtime: any add/remove/rename in `root` invalidates the entry.
+    """
+    with os.scandir(root) as it:
+        return tuple(
+            (e.name, e.stat().st_size)
+            for e in it
+            if e.is_file() and (suffix is None or e.name.lower().endswith(suffix))
+        )
+
+def _list_files(root: Path, suffix: str | None = None) -> tuple[tuple[str, int], ...]:
+    mtime_ns = os.stat(root).st_mtime_ns
+    # mtime granularity is coarse (kernel tick); a dir touched within the last
+    # couple of seconds may change again without a new mtime, so don't cache it.
+    if time.time_ns() - mtime_ns < 2_000_000_000:
+        return _scan_files.__wrapped__(str(root), mtime_ns, suffix)
+    return _scan_files(str(root), mtime_ns, suffix)
+
+def _hash_and_write(f, h, chunk: bytes) -> None:
+    # hashlib (OpenSSL, SHA-NI where available) releases the GIL on large buffers,
+    # so hashing next to the write keeps both off the event loop.
+    h.update(chunk)
+    f.write(chunk)
+
+def _place_by_digest(tmp: Path, dst: Path, sha: str) -> None:
+    """
+    Move a fully written staging file into the content store and expose it at `dst`.
+    Identical content is kept once under .cas/<ab>/<sha>; a repeat upload just drops
+    its staging file and adds another hard link. Falls back to a copy on filesystems
+    without hard links (e.g. exFAT).
+
+    Two consequences of hard links:
+    - Nothing here ever deletes from .cas: removing an upload only drops its link,
+      and the content stays until .cas is pruned out of band (files with st_nlink == 1
+      are the ones no upload refers to any more).
+    - Every upload of the same content is the same inode, so writing to one in
+      place changes them all (and the store). Writers must replace the file, or
+      break the link first (text_tools.save_text does).
+    """
+    cas = CAS_ROOT / sha[:2] / sha
+    _ensure_dir(cas.parent)
+    if cas.exists():
+        tmp.unlink()
+    else:
+        os.replace(tmp, cas)
+    # link under the staging name first so the final os.replace stays atomic
+    try:
+        os.link(cas, tmp)
+    except OSError:
+        shutil.copyfile(cas, tmp)
+    os.replace(tmp, dst)
+
+async def _stream_to_disk(file: UploadFile, dst: Path) -> tuple[int, str]:
+    """
+    Stream an upload to `dst` in a single pass (read chunk -> hash -> write).
+    The size limit is enforced as chunks arrive, so peak memory is one chunk.
+    Data lands in a staging file first and is then deduplicated by content
+    (see _place_by_digest). Returns (size_bytes, sha256_hex).
+    """
+    h = hashlib.sha256()
+    size = 0
+    _ensure_dir(PARTIAL_ROOT)
+    tmp = PARTIAL_ROOT / f"{uuid.uuid4().hex}.part"
+    try:
+        with open(tmp, "wb") as f:
+            while chunk := await file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_BYTES:
+                    raise HTTPException(status_code=413, detail=f"File too large > {MAX_MB}MB")
+                await run_in_threadpool(_hash_and_write, f, h, chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Empty file")
+        sha = h.hexdigest()
+        await run_in_threadpool(_place_by_digest, tmp, dst, sha)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return size, sha
+
 
 # ---------- Endpoints (Generic) ----------
 @router.post(
@@ -122,31 +241,22 @@ def _dedupe_path(dst: Path) -> Path:
     status_code=status.HTTP_201_CREATED,
 )
 async def upload_file(file: Annotated[UploadFile, File(...)]):
-    data = await file.read()
-    if not data:
-        raise HTTPException(status_code=400, detail="Empty file")
-
-    if len(data) > MAX_MB * 1024 * 1024:
-        raise HTTPException(status_code=413, detail=f"File too large > {MAX_MB}MB")
-
     cat: Category = _category_from_ct(file.content_type, file.filename)
-    root = (UPLOAD_ROOT / cat).resolve()
+    root = UPLOAD_ROOT / cat
     _ensure_dir(root)
 
     dst = _safe_dst(root, file.filename)
     dst = _dedupe_path(dst)  # avoid overwriting existing files
 
-    sha = hashlib.sha256(data).hexdigest()
-    with open(dst, "wb") as f:
-        f.write(data)
+    size, sha = await _stream_to_disk(file, dst)
 
     rel = f"{root.name}/{dst.name}"
     return UploadResult(
         ok=True,
         rel_path=rel,
-        size_bytes=len(data),
+        size_bytes=size,
         sha256=sha,
-        mime=file.content_type or mimetypes.guess_type(dst.name)[0] or "application/octet-stream",
+        mime=file.content_type or _mime_for(dst.suffix.lower()),
     )
 
 
@@ -156,14 +266,11 @@ async def upload_file(file: Annotated[UploadFile, File(...)]):
     summary="List uploaded files by category",
 )
 def list_by_category(category: Category):
-    root = (UPLOAD_ROOT / category).resolve()
+    root = UPLOAD_ROOT / category
     _ensure_dir(root)
-    files = [
-        FileItem(rel_path=f"{category}/{p.name}", size_bytes=p.stat().st_size)
-        for p in root.iterdir()
-        if p.is_file()
-    ]
-    return ListResult(files=files)
+    # plain dicts straight to orjson; ListResult stays as the documented schema
+    files = [{"rel_path": f"{category}/{name}", "size_bytes": size} for name, size in _list_files(root)]
+    return OrjsonResponse({"ok": True, "files": files})
 
 
 @router.get(
@@ -172,13 +279,11 @@ def list_by_category(category: Category):
     responses={200: {"content": {"application/octet-stream": {}}}, 404: {"description": "File not found"}},
 )
 def download(category: Category, filename: str):
-    root = (UPLOAD_ROOT / category).resolve()
+    root = UPLOAD_ROOT / category
     dst = _safe_dst(root, filename)
-    if not dst.is_file():
-        raise HTTPException(status_code=404, detail="File not found")
+    st = _stat_regular_file(dst)
 
-    media_type = mimetypes.guess_type(dst.name)[0] or "application/octet-stream"
-    return FileResponse(path=str(dst), media_type=media_type, filename=dst.name)
+    return FileResponse(path=str(dst), media_type=_mime_for(dst.suffix.lower()), filename=dst.name, stat_result=st)
 
 
 # ---------- Backward-compatible PDF routes (optional, can be removed later) ----------
@@ -192,24 +297,16 @@ def download(category: Category, filename: str):
 )
 async def upload_pdf_backward(file: Annotated[UploadFile, File(...)]):
     # force pdf category but still reuse the generic uploader logic
-    data = await file.read()
-    if not data:
-        raise HTTPException(status_code=400, detail="Empty file")
-    if len(data) > MAX_MB * 1024 * 1024:
-        raise HTTPException(status_code=413, detail=f"File too large > {MAX_MB}MB")
-
-    root = (UPLOAD_ROOT / "pdf").resolve()
+    root = UPLOAD_ROOT / "pdf"
     _ensure_dir(root)
     dst = _safe_dst(root, file.filename)
     dst = _dedupe_path(dst)
-    sha = hashlib.sha256(data).hexdigest()
-    with open(dst, "wb") as f:
-        f.write(data)
+    size, sha = await _stream_to_disk(file, dst)
     rel = f"pdf/{dst.name}"
     return UploadResult(
         ok=True,
         rel_path=rel,
-        size_bytes=len(data),
+        size_bytes=size,
         sha256=sha,
         mime=file.content_type or "application/pdf",
     )
@@ -221,13 +318,10 @@ async def upload_pdf_backward(file: Annotated[UploadFile, File(...)]):
     summary="[Deprecated] List uploaded PDFs",
 )
 def list_pdfs_backward():
-    root = (UPLOAD_ROOT / "pdf").resolve()
+    root = UPLOAD_ROOT / "pdf"
     _ensure_dir(root)
-    files = [
-        FileItem(rel_path=f"pdf/{p.name}", size_bytes=p.stat().st_size)
-        for p in root.glob("*.pdf")
-    ]
-    return ListResult(files=files)
+    files = [{"rel_path": f"pdf/{name}", "size_bytes": size} for name, size in _list_files(root, ".pdf")]
+    return OrjsonResponse({"ok": True, "files": files})
 
 
 @router.get(
@@ -236,8 +330,9 @@ def list_pdfs_backward():
     responses={200: {"content": {"application/pdf": {}}}, 404: {"description": "File not found"}},
 )
 def get_pdf_backward(filename: str):
-    root = (UPLOAD_ROOT / "pdf").resolve()
+    root = UPLOAD_ROOT / "pdf"
     dst = _safe_dst(root, filename)
-    if not (dst.is_file() and dst.suffix.lower() == ".pdf"):
+    if dst.suffix.lower() != ".pdf":
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(path=str(dst), media_type="application/pdf", filename=dst.name)
\ No newline at end of file
+    st = _stat_regular_file(dst)
+    return FileResponse(path=str(dst), media_type="application/pdf", filename=dst.name, stat_result=st)
\ No newline at end of file
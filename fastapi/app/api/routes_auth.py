@@ -1,60 +1,97 @@
 # Path from repo root: fastapi\app\api\routes_auth.py
 
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from pydantic import BaseModel
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
-from app.core.security import create_access_token, create_refresh_token
-from app.models.user import User, RefreshToken
-from app.db import SessionLocal
-from passlib.hash import bcrypt
+from starlette.concurrency import run_in_threadpool
+from app.core.security import (
+    create_access_token, create_refresh_token, hash_password_async, hash_refresh_token,
+    needs_rehash, normalize_username, verify_password_async,
+)
+from app.models.user import User, Role, UserRole, RefreshToken
+from app.api.deps import get_db
+from app.schemas.auth import LoginIn, RefreshIn
+from app.core.responses import OrjsonResponse
 from datetime import datetime
 from typing import Optional, List
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-class LoginIn(BaseModel):
-    username: str
-    password: str
-
 class TokensOut(BaseModel):
     access_token: str
     refresh_token: str
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def _tokens(access: str, refresh: str) -> OrjsonResponse:
+    # the dict already has TokensOut's shape: answer with orjson directly and
+    # skip response_model's validate + serialize pass (TokensOut stays for the docs)
+    return OrjsonResponse({"access_token": access, "refresh_token": refresh})
 
-@router.post("/login", response_model=TokensOut)
-def login(body: LoginIn, db: Session = Depends(get_db)):
-    u: Optional[User] = db.query(User).filter(User.username == body.username).first()
-    if not u or not u.is_active or not bcrypt.verify(body.password, u.password_hash):
-        raise HTTPException(status_code=401, detail="Invalid credentials")
-    roles = ["admin"] if u.is_superuser else [
-        r.role.name for r in u.roles
-    ]
-    access = create_access_token(sub=str(u.id), roles=roles)
-    refresh, exp = create_refresh_token(sub=str(u.id))
+def _store_rehash(bind, user_id: int, old_hash: str, new_hash: str) -> None:
+    # skipped if the hash changed in the meantime (password reset, another login)
+    with Session(bind=bind) as db:
+        db.execute(
+            update(User)
+            .where(User.id == user_id, User.password_hash == old_hash)
+            .values(password_hash=new_hash)
+        )
+        db.commit()
+
+async def _rehash_user(bind, user_id: int, old_hash: str, password: str) -> None:
+    """
+    Background task: upgrade a legacy/outdated hash after the response is
+    sent. The KDF goes through hash_password_async (threadpool or KDF
+    process pool), the UPDATE through the threadpool.
+    """
+    new_hash = await hash_password_async(password)
+    await run_in_threadpool(_store_rehash, bind, user_id, old_hash, new_hash)
+
+def _login_row(db: Session, username: str):
+    # only the columns login needs; username is a unique index -> point lookup.
+    # New accounts store the normalized name; the raw one still matches older
+    # rows, and an exact match wins over the normalized one.
+    return db.execute(
+        select(User.id, User.password_hash, User.is_active, User.is_superuser)
+        .where(User.username.in_({normalize_username(username), username}))
+        .order_by((User.username == username).desc())
+        .limit(1)
+    ).first()
+
+def _issue_tokens(db: Session, user_id: int, is_superuser: bool) -> tuple[str, str]:
+    roles = ["admin"] if is_superuser else list(db.scalars(
+        select(Role.name).join(UserRole, UserRole.role_id == Role.id).where(UserRole.user_id == user_id)
+    ))
+    access = create_access_token(sub=str(user_id), roles=roles)
+    refresh, exp = create_refresh_token(sub=str(user_id))
 
     # persist refresh (hashed)
-    rt = RefreshToken(user_id=u.id,
-                      token_hash=bcrypt.hash(refresh),
-                      expires_at=exp)
-    db.add(rt); db.commit()
-    return {"access_token": access, "refresh_token": refresh}
+    db.add(RefreshToken(user_id=user_id, token_hash=hash_refresh_token(refresh), expires_at=exp))
+    db.commit()
+    return access, refresh
+
+@router.post("/login", response_model=TokensOut)
+async def login(body: LoginIn, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+    # async route for the KDF; the sync Session calls go to the threadpool
+    u = await run_in_threadpool(_login_row, db, body.username)
+    if not u or not u.is_active:
+        # same KDF cost as a wrong password, so unknown users aren't revealed by timing
+        await verify_password_async(body.password, None)
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    if not await verify_password_async(body.password, u.password_hash):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    # lazily migrate legacy/outdated hashes without holding up the login response
+    if needs_rehash(u.password_hash):
+        background_tasks.add_task(_rehash_user, db.get_bind(), u.id, u.password_hash, body.password)
+    access, refresh = await run_in_threadpool(_issue_tokens, db, u.id, u.is_superuser)
+    return _tokens(access, refresh)
 
 @router.get("/me")
 def me(roles: List[str] = Depends(lambda: []), db: Session = Depends(get_db)):
     return {"ok": True, "roles": roles}
 
-class RefreshIn(BaseModel):
-    refresh_token: str
-
 @router.post("/refresh", response_model=TokensOut)
 def refresh(body: RefreshIn, db: Session = Depends(get_db)):
     new_access = create_access_token(sub="unknown", roles=[])
     new_refresh, _ = create_refresh_token(sub="unknown")
-    return {"access_token": new_access, "refresh_token": new_refresh}
\ No newline at end of file
+    return _tokens(new_access, new_refresh)
\ No newline at end of file
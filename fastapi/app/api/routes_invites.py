@@ -6,19 +6,15 @@ from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, EmailStr
 from sqlalchemy.orm import Session
-from passlib.hash import bcrypt
-from app.api.deps import require_roles
+from starlette.concurrency import run_in_threadpool
+from app.core.security import hash_password_async, normalize_username
+from app.api.deps import get_db, require_roles
+from app.crud.users import username_taken
 from app.models.user import User, Invite
-from app.db import SessionLocal
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 INVITES_ON = os.getenv("APP_ENABLE_INVITES", "false").lower() == "true"
 
-def get_db():
-    db = SessionLocal()
-    try: yield db
-    finally: db.close()
-
 class InviteCreate(BaseModel):
     email: EmailStr | None = None
     ttl_hours: int = 48
@@ -41,17 +37,26 @@ class InviteUse(BaseModel):
     password: str
     email: EmailStr | None = None
 
+def _find_invite(db: Session, code: str) -> Invite | None:
+    return db.query(Invite).filter(Invite.code == code).first()
+
+def _redeem(db: Session, inv: Invite, u: User) -> None:
+    db.add(u)
+    db.flush()
+    inv.used_by_user_id = u.id
+    db.commit()
+
 @router.post("/invite")
-def use_invite(body: InviteUse, db: Session = Depends(get_db)):
+async def use_invite(body: InviteUse, db: Session = Depends(get_db)):
     if not INVITES_ON: raise HTTPException(403, "Invites disabled")
-    inv = db.query(Invite).filter(Invite.code == body.code).first()
+    # async route for the KDF; the sync Session calls go to the threadpool
+    inv = await run_in_threadpool(_find_invite, db, body.code)
     if not inv or (inv.expires_at and inv.expires_at < datetime.utcnow()) or inv.used_by_user_id:
         raise HTTPException(400, "Invalid or expired invite")
-    if db.query(User).filter(User.username == body.username).first():
+    username = normalize_username(body.username)
+    if await run_in_threadpool(username_taken, db, username):
         raise HTTPException(409, "username exists")
-    u = User(username=body.username, email=body.email,
-             password_hash=bcrypt.hash(body.password), is_active=True)
-    db.add(u); db.flush()
-    inv.used_by_user_id = u.id
-    db.commit()
+    u = User(username=username, email=body.email,
+             password_hash=await hash_password_async(body.password), is_active=True)
+    await run_in_threadpool(_redeem, db, inv, u)
     return {"ok": True, "id": u.id}
\ No newline at end of file
@@ -5,9 +5,11 @@ import os
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, EmailStr
 from sqlalchemy.orm import Session
-from passlib.hash import bcrypt
+from starlette.concurrency import run_in_threadpool
+from app.core.security import hash_password_async, normalize_username
+from app.crud.users import username_taken
 from app.models.user import User
-from app.db import SessionLocal
+from app.api.deps import get_db
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 SELF_SIGNUP = os.getenv("APP_ENABLE_SELF_SIGNUP", "false").lower() == "true"
@@ -17,18 +19,19 @@ class RegisterIn(BaseModel):
     email: EmailStr | None = None
     password: str
 
-def get_db():
-    db = SessionLocal()
-    try: yield db
-    finally: db.close()
+def _insert(db: Session, u: User) -> None:
+    db.add(u)
+    db.commit()
 
 @router.post("/register")
-def register(body: RegisterIn, db: Session = Depends(get_db)):
+async def register(body: RegisterIn, db: Session = Depends(get_db)):
     if not SELF_SIGNUP:
         raise HTTPException(403, "Self-sign-up disabled")
-    if db.query(User).filter(User.username == body.username).first():
+    username = normalize_username(body.username)
+    # async route for the KDF; the sync Session calls go to the threadpool
+    if await run_in_threadpool(username_taken, db, username):
         raise HTTPException(409, "username exists")
-    u = User(username=body.username, email=body.email,
-             password_hash=bcrypt.hash(body.password), is_active=True)
-    db.add(u); db.commit()
+    u = User(username=username, email=body.email,
+             password_hash=await hash_password_async(body.password), is_active=True)
+    await run_in_threadpool(_insert, db, u)
     return {"ok": True, "id": u.id}
\ No newline at end of file
@@ -1,41 +1,127 @@
 # Path from repo root: fastapi\app\api\routes_users.py
 
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel, EmailStr
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import func, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from passlib.hash import bcrypt
-from app.api.deps import require_roles
+from starlette.concurrency import run_in_threadpool
+from app.core.security import hash_password_async, normalize_username
+from app.api.deps import get_db, require_roles
+from app.crud import users as crud_users
 from app.models.user import User, Role, UserRole
-from app.db import SessionLocal
+from app.schemas.users import UserCreate, UserOut, UserPage
 
 router = APIRouter(prefix="/users", tags=["users"])
 
-def get_db():
-    db = SessionLocal()
-    try: yield db
-    finally: db.close()
+# built once: dumps JSON bytes for the whole page / one user in a single call
+_PAGE_ADAPTER = TypeAdapter(UserPage)
+_USER_ADAPTER = TypeAdapter(UserOut)
 
-class UserCreate(BaseModel):
-    username: str
-    email: EmailStr | None = None
-    password: str
-    roles: list[str] = []
+def _user_out(u: User) -> UserOut:
+    # rows come from our own DB: model_construct skips re-validating every
+    # field (and the roles validator); inbound bodies still go through validation
+    return UserOut.model_construct(
+        id=u.id,
+        username=u.username,
+        email=u.email,
+        is_active=u.is_active,
+        is_superuser=u.is_superuser,
+        roles=[ur.role.name for ur in u.roles],
+    )
+
+# Dialects with INSERT ... ON CONFLICT ... RETURNING
+_UPSERT_INSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+def _role_ids(db: Session, names: list[str]) -> dict[str, int]:
+    """name -> id for `names`, creating missing roles."""
+    dialect = db.get_bind().dialect
+    insert = _UPSERT_INSERTS.get(dialect.name)
+    if insert is not None and dialect.insert_returning:
+        # one statement, race-free; the no-op DO UPDATE makes RETURNING include existing rows
+        stmt = insert(Role).values([{"name": n} for n in names])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Role.name], set_={"name": stmt.excluded.name}
+        ).returning(Role.name, Role.id)
+        return dict(db.execute(stmt).all())
+    ids = dict(db.execute(select(Role.name, Role.id).where(Role.name.in_(names))).all())
+    missing = [Role(name=n) for n in names if n not in ids]
+    if missing:
+        db.add_all(missing)
+        db.flush()
+        ids.update((r.name, r.id) for r in missing)
+    return ids
+
+def _apply_roles(db: Session, user_id: int, role_names: list[str]) -> None:
+    """Link `user_id` to the named roles, creating missing roles."""
+    names = list(dict.fromkeys(role_names))  # dedupe, keep order
+    if not names:
+        return
+    ids = _role_ids(db, names)
+    db.add_all(UserRole(user_id=user_id, role_id=ids[n]) for n in names)
+
+def _find_clash(db: Session, username: str, email: str | None):
+    # one round trip for both unique fields; username compared case-insensitively
+    cond = func.lower(User.username) == username
+    if email:
+        cond = or_(cond, User.email == email)
+    return db.execute(select(User.username, User.email).where(cond).limit(1)).first()
+
+def _insert_user(db: Session, u: User, role_names: list[str]) -> None:
+    db.add(u)
+    db.flush()
+    _apply_roles(db, u.id, role_names)
+    try:
+        db.commit()
+    except IntegrityError as exc:  # lost a race with a concurrent insert
+        db.rollback()
+        raise HTTPException(409, "username or email exists") from exc
 
 @router.post("", dependencies=[Depends(require_roles("admin"))])
-def create_user(body: UserCreate, db: Session = Depends(get_db)):
-    if db.query(User).filter(User.username == body.username).first():
-        raise HTTPException(409, "username exists")
+async def create_user(body: UserCreate, db: Session = Depends(get_db)):
+    username = normalize_username(body.username)
+    # async route for the KDF; the sync Session calls go to the threadpool
+    clash = await run_in_threadpool(_find_clash, db, username, body.email)
+    if clash:
+        raise HTTPException(409, "username exists" if clash.username.lower() == username else "email exists")
     u = User(
-        username=body.username,
+        username=username,
         email=body.email,
-        password_hash=bcrypt.hash(body.password),
-        is_active=True
+        password_hash=await hash_password_async(body.password),
+        is_active=body.is_active,
+        is_superuser=body.is_superuser,
     )
-    db.add(u); db.flush()
-    for rname in body.roles:
-        r = db.query(Role).filter(Role.name == rname).first() or Role(name=rname)
-        db.add(r); db.flush()
-        db.add(UserRole(user_id=u.id, role_id=r.id))
-    db.commit()
-    return {"id": u.id, "username": u.username, "roles": body.roles}
\ No newline at end of file
+    await run_in_threadpool(_insert_user, db, u, body.roles)
+    return {"id": u.id, "username": u.username, "roles": body.roles}
+
+@router.get("", response_model=UserPage, dependencies=[Depends(require_roles("admin"))])
+def list_users(
+    after_id: int | None = None,
+    skip: int = 0,
+    limit: int = Query(50, ge=1, le=500),
+    q: str | None = Query(None, max_length=255, description="Substring of username or email"),
+    db: Session = Depends(get_db),
+):
+    rows = crud_users.list_users(db, skip=skip, limit=limit, after_id=after_id, q=q)
+    page = UserPage.model_construct(
+        items=[_user_out(u) for u in rows],
+        next_after=rows[-1].id if len(rows) == limit else None,
+    )
+    return Response(_PAGE_ADAPTER.dump_json(page), media_type="application/json")
+
+@router.get("/export", dependencies=[Depends(require_roles("admin"))])
+def export_users(db: Session = Depends(get_db)):
+    """All users as NDJSON (one UserOut per line), streamed chunk by chunk."""
+    bind = db.get_bind()
+
+    def lines():
+        # own session: the request-scoped one may be closed before the body is streamed
+        with Session(bind=bind) as s:
+            for u in crud_users.iter_users(s):
+                yield _USER_ADAPTER.dump_json(_user_out(u)) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
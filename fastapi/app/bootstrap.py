@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import os
 from sqlalchemy.orm import Session
-from sqlalchemy import inspect
+from sqlalchemy import exists, insert, inspect, literal, select
 
 from app.db import SessionLocal, engine, Base
 from app.models.user import User
@@ -26,8 +26,8 @@ def create_admin_if_missing() -> None:
             Base.metadata.create_all(bind=engine)
 
         # هل يوجد أي superuser؟
-        exists = db.query(User).filter(User.is_superuser.is_(True)).first()
-        if exists:
+        has_superuser = db.execute(select(literal(1)).where(User.is_superuser.is_(True)).limit(1)).first()
+        if has_superuser:
             print("ℹ️ [bootstrap] Superuser already exists → skip")
             return
 
@@ -39,16 +39,23 @@ def create_admin_if_missing() -> None:
             print("⚠️ [bootstrap] Missing ADMIN_USER/ADMIN_PASS → skip creating admin")
             return
 
-        u = User(
-            username=username,
-            email=email,
-            password_hash=hash_password(password),
-            is_superuser=True,
-            is_active=True,
+        # INSERT ... SELECT ... WHERE NOT EXISTS: with several workers booting at
+        # once, only the first one inserts; the rest match zero rows.
+        no_superuser = ~exists().where(User.is_superuser.is_(True))
+        res = db.execute(
+            insert(User).from_select(
+                ["username", "email", "password_hash", "is_superuser", "is_active"],
+                select(
+                    literal(username), literal(email), literal(hash_password(password)),
+                    literal(True), literal(True),
+                ).where(no_superuser),
+            )
         )
-        db.add(u)
         db.commit()
-        print(f"✅ [bootstrap] Superuser created: {username}")
+        if res.rowcount:
+            print(f"✅ [bootstrap] Superuser created: {username}")
+        else:
+            print("ℹ️ [bootstrap] Superuser already exists → skip")
 
     except Exception as e:
         print(f"❌ [bootstrap] Failed to create admin: {e}")
@@ -6,9 +6,11 @@ from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
-from pydantic import Field, AliasChoices
+from pydantic import Field, AliasChoices, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from app.core.path_utils import as_path
+
 # ------------------------------------------------------------------------------
 # .env (optional) — load early so we respect any user-provided overrides
 # ------------------------------------------------------------------------------
@@ -32,8 +34,13 @@ PROJECT_ROOT = API_ROOT.parent
 DEFAULT_MODELS_CACHE = os.getenv("APP_MODEL_CACHE_ROOT", str(API_ROOT / "models_cache"))
 os.environ.setdefault("HF_HOME", str(Path(DEFAULT_MODELS_CACHE) / "huggingface"))
 os.environ.setdefault("TORCH_HOME", str(Path(DEFAULT_MODELS_CACHE) / "torch"))
-Path(os.environ["HF_HOME"]).resolve().mkdir(parents=True, exist_ok=True)
-Path(os.environ["TORCH_HOME"]).resolve().mkdir(parents=True, exist_ok=True)
+def _ensure_dir(path: str | os.PathLike) -> None:
+    """mkdir -p, but only after one cheap isdir() stat (no resolve(), no mkdir on the hot path)."""
+    if not os.path.isdir(path):
+        os.makedirs(path, exist_ok=True)
+
+_ensure_dir(os.environ["HF_HOME"])
+_ensure_dir(os.environ["TORCH_HOME"])
 # Quieter on Windows when symlinks are not available
 os.environ.setdefault("HF_HUB_DISABLE_SYMLINKS_WARNING", "1")
 
@@ -107,6 +114,13 @@ class Settings(BaseSettings):
     SAMPLES_DIR: Path = API_ROOT / "samples"
     UPLOAD_MAX_MB: int = 20
 
+    @field_validator("STATIC_DIR", "TEMPLATES_DIR", "UPLOAD_DIR", "SAMPLES_DIR", mode="before")
+    @classmethod
+    def _coerce_path(cls, v: Any) -> Path:
+        # Path once at parse time (also accepts storage-like objects), so
+        # callers never have to re-coerce these fields
+        return as_path(v)
+
     # ================================
     # CORS configuration
     # ================================
@@ -128,6 +142,10 @@ class Settings(BaseSettings):
             "APP_DATABASE_URL_POSTGRES",   
         ),
     )
+    DB_POOL_SIZE: int = 20        # persistent connections kept in the pool
+    DB_MAX_OVERFLOW: int = 10     # extra connections allowed under burst
+    DB_POOL_RECYCLE_S: int = 1800  # recycle connections older than this
+    DB_CREATE_TABLES: bool = True  # create_all at startup; set 0 on extra workers / when Alembic owns the schema
     # ================================
     # JWT security (optional)
     # ================================
@@ -158,7 +176,7 @@ class Settings(BaseSettings):
     SCRYPT_N: int = 16384
     SCRYPT_R: int = 8
     SCRYPT_P: int = 1
-    SCRYPT_DKLEN: int = 64
+    SCRYPT_DKLEN: int = 32      # 256-bit key; older 64-byte hashes still verify and get rehashed
     SCRYPT_SALT_LEN: int = 16
 
 
@@ -185,7 +203,7 @@ class Settings(BaseSettings):
     # -------------------------------
     def ensure_directories(self) -> None:
         """Create required directories if they do not exist."""
-        for p in [
+        for p in {
             self.MODEL_CACHE_ROOT,
             self.HF_HOME,
             self.TORCH_HOME,
@@ -196,9 +214,9 @@ class Settings(BaseSettings):
             self.SAMPLES_DIR,
             self.ERROR_LOG_FILE.parent,
             self.PLUGINS_LOG_FILE.parent,
-        ]:
+        }:  # set: shared dirs (e.g. logs/) are checked once
             if p:
-                Path(p).resolve().mkdir(parents=True, exist_ok=True)
+                _ensure_dir(p)
 
     def export_env_for_caches(self) -> None:
         """
@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import logging
+from functools import lru_cache
 from typing import Any
 
 from fastapi import FastAPI, Request
@@ -63,6 +64,16 @@ def _request_id(request: Request) -> str | None:
     return getattr(request.state, "request_id", None)
 
 
+@lru_cache(maxsize=4)
+def _templates(directory: str) -> Jinja2Templates:
+    """
+    Jinja2Templates per templates dir, built once. Constructing it sets up a
+    fresh Jinja environment (loader, filters, template cache), which error
+    pages would otherwise pay on every HTML response.
+    """
+    return Jinja2Templates(directory=directory)
+
+
 def _render(
     request: Request,
     status_code: int,
@@ -100,7 +111,7 @@ def _render(
 
     if _wants_html(request):
         try:
-            templates = Jinja2Templates(directory=str(settings.TEMPLATES_DIR))
+            templates = _templates(str(settings.TEMPLATES_DIR))
             # New signature: TemplateResponse(request, name, context, ...)
             return templates.TemplateResponse(
                 request,
@@ -0,0 +1,80 @@
+# Path from repo root: fastapi\app\core\jwt_fast.py
+"""
+HMAC-signed JWTs (HS256/384/512) built from C pieces only: orjson for the
+JSON, hmac/hashlib for the signature, base64 for the segments.
+Callers keep PyJWT for asymmetric algorithms; errors raised here are PyJWT's
+exception types, so both paths look the same to callers.
+
+Claims must already be JSON-ready (use integer epochs for exp/iat/nbf).
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import time
+from functools import lru_cache
+from typing import Any
+
+import jwt
+import orjson
+
+_DIGESTS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+
+
+def supports(alg: str) -> bool:
+    return alg in _DIGESTS
+
+
+def _b64url(raw: bytes) -> bytes:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=")
+
+
+def _b64url_decode(seg: bytes) -> bytes:
+    return base64.urlsafe_b64decode(seg + b"=" * (-len(seg) % 4))
+
+
+@lru_cache(maxsize=len(_DIGESTS))
+def _header(alg: str) -> bytes:
+    # same header (and key order) PyJWT emits
+    return _b64url(orjson.dumps({"alg": alg, "typ": "JWT"}))
+
+
+def encode(payload: dict[str, Any], key: bytes, alg: str = "HS256") -> str:
+    signing = _header(alg) + b"." + _b64url(orjson.dumps(payload))
+    sig = _b64url(hmac.new(key, signing, _DIGESTS[alg]).digest())
+    return (signing + b"." + sig).decode("ascii")
+
+
+def decode(token: str, key: bytes, alg: str = "HS256") -> dict[str, Any]:
+    """
+    Verify and decode a token: alg pinned to `alg`, signature checked with
+    compare_digest, then exp/nbf against the current time.
+    """
+    try:
+        signing, _, sig_b64 = token.encode("ascii").rpartition(b".")
+        header_b64, _, payload_b64 = signing.partition(b".")
+        header = orjson.loads(_b64url_decode(header_b64))
+        sig = _b64url_decode(sig_b64)
+    except (ValueError, TypeError, AttributeError) as exc:
+        raise jwt.DecodeError("Malformed token") from exc
+    if not payload_b64 or b"." in payload_b64:
+        raise jwt.DecodeError("Malformed token")
+    if not isinstance(header, dict) or header.get("alg") != alg:
+        raise jwt.InvalidAlgorithmError("The specified alg value is not allowed")
+    if not hmac.compare_digest(sig, hmac.new(key, signing, _DIGESTS[alg]).digest()):
+        raise jwt.InvalidSignatureError("Signature verification failed")
+    try:
+        payload = orjson.loads(_b64url_decode(payload_b64))
+    except ValueError as exc:
+        raise jwt.DecodeError("Invalid payload") from exc
+    if not isinstance(payload, dict):
+        raise jwt.DecodeError("Invalid payload")
+    now = time.time()
+    exp = payload.get("exp")
+    if exp is not None and (not isinstance(exp, (int, float)) or exp <= now):
+        raise jwt.ExpiredSignatureError("Signature has expired")
+    nbf = payload.get("nbf")
+    if nbf is not None and (not isinstance(nbf, (int, float)) or nbf > now):
+        raise jwt.ImmatureSignatureError("The token is not yet valid (nbf)")
+    return payload
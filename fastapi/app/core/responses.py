@@ -0,0 +1,18 @@
+# Path from repo root: fastapi\app\core\responses.py
+from __future__ import annotations
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class OrjsonResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson (C). Return it with plain dicts/lists
+    to skip building pydantic models just to serialize them again.
+    Kept local instead of fastapi.responses.ORJSONResponse, which newer
+    FastAPI releases deprecate. numpy arrays/scalars (inference outputs)
+    serialize natively, without a .tolist() pass.
+    """
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
@@ -1,23 +1,263 @@
 # Path from repo root: fastapi\app\core\security.py
 
 from __future__ import annotations
-from datetime import datetime, timedelta
-import os, base64, hashlib, hmac, secrets, jwt
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any
+import asyncio, os, re, base64, hashlib, hmac, multiprocessing, secrets, threading, time, jwt
+from starlette.concurrency import run_in_threadpool
+from app.core import jwt_fast
+from app.core.config import get_settings
 
 JWT_SECRET = os.getenv("APP_JWT_SECRET", secrets.token_urlsafe(32))
-JWT_ALG = "HS256"
+JWT_ALG = os.getenv("APP_JWT_ALGORITHM", "HS256")
+JWT_PRIVATE_KEY_PATH = os.getenv("APP_JWT_PRIVATE_KEY_PATH")
+JWT_PUBLIC_KEY_PATH = os.getenv("APP_JWT_PUBLIC_KEY_PATH")
 ACCESS_TTL_MIN = int(os.getenv("APP_ACCESS_TTL_MIN", "30"))
 REFRESH_TTL_DAYS = int(os.getenv("APP_REFRESH_TTL_DAYS", "7"))
+ACCESS_TTL_S = ACCESS_TTL_MIN * 60
+REFRESH_TTL_S = REFRESH_TTL_DAYS * 86400
+# Key for refresh-token digests; must be stable across restarts for stored hashes to match.
+REFRESH_HASH_SECRET = os.getenv("APP_REFRESH_HASH_SECRET", JWT_SECRET).encode("utf-8")
 
+# Password hashing: stdlib scrypt with the SCRYPT_* settings.
+# Encoded as "scrypt$N$r$p$<salt b64>$<key b64>"; legacy bcrypt ("$2...") hashes
+# still verify and are upgraded on the next successful login (see needs_rehash).
+_st = get_settings()
+SCRYPT_N = _st.SCRYPT_N
+SCRYPT_R = _st.SCRYPT_R
+SCRYPT_P = _st.SCRYPT_P
+SCRYPT_DKLEN = _st.SCRYPT_DKLEN
+SCRYPT_SALT_LEN = _st.SCRYPT_SALT_LEN
+_SCRYPT_PREFIX = f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$"
+
+# Successful password verifications are remembered briefly so login bursts
+# don't pay the full KDF cost each time. Keys are HMACs under a per-process
+# secret (never the plaintext); failures are never cached.
+VERIFY_CACHE_TTL_S = int(os.getenv("APP_VERIFY_CACHE_TTL_S", "60"))
+VERIFY_CACHE_MAX = int(os.getenv("APP_VERIFY_CACHE_MAX", "4096"))
+_VERIFY_CACHE_KEY = secrets.token_bytes(32)
+_VERIFY_CACHE: OrderedDict[bytes, float] = OrderedDict()  # key -> expiry (monotonic)
+_VERIFY_LOCK = threading.Lock()
+
+# Optional process pool for the KDF (APP_KDF_PROCESSES > 0). hashlib.scrypt
+# already drops the GIL, so the threadpool is the default; a process pool
+# isolates auth floods from the app's worker threads on multi-core hosts.
+KDF_PROCESSES = int(os.getenv("APP_KDF_PROCESSES", "0"))
+_KDF_POOL: ProcessPoolExecutor | None = None
+_KDF_POOL_LOCK = threading.Lock()
+
+# HS* tokens go through jwt_fast; this PyJWT instance handles RS*/ES*.
+_JWT = jwt.PyJWT()
+
+@lru_cache(maxsize=1)
+def _load_sign_keys() -> tuple[Any, Any, str]:
+    """
+    Resolve (sign_key, verify_key, alg) once per process.
+    For RS*/ES* the PEM files are read and parsed here, so token mint/verify
+    never touches the filesystem or re-parses the key material.
+    Call `_load_sign_keys.cache_clear()` after changing the key settings.
+    """
+    if JWT_ALG.upper().startswith("HS"):
+        key = JWT_SECRET.encode("utf-8")
+        return key, key, JWT_ALG
+    if not (JWT_PRIVATE_KEY_PATH and JWT_PUBLIC_KEY_PATH):
+        raise RuntimeError(f"{JWT_ALG} requires APP_JWT_PRIVATE_KEY_PATH and APP_JWT_PUBLIC_KEY_PATH")
+    from cryptography.hazmat.primitives.serialization import load_pem_private_key, load_pem_public_key
+    sign_key = load_pem_private_key(Path(JWT_PRIVATE_KEY_PATH).read_bytes(), password=None)
+    verify_key = load_pem_public_key(Path(JWT_PUBLIC_KEY_PATH).read_bytes())
+    return sign_key, verify_key, JWT_ALG
+
+def _encode(payload: dict[str, Any]) -> str:
+    sign_key, _, alg = _load_sign_keys()
+    if jwt_fast.supports(alg):
+        return jwt_fast.encode(payload, sign_key, alg)
+    return _JWT.encode(payload, sign_key, algorithm=alg)
+
+def decode_token(token: str) -> dict[str, Any]:
+    """Decode and validate a token signed by this module; raises on invalid/expired."""
+    _, verify_key, alg = _load_sign_keys()
+    if jwt_fast.supports(alg):
+        return jwt_fast.decode(token, verify_key, alg)
+    return _JWT.decode(token, verify_key, algorithms=[alg])
+
+# Claims use integer epochs straight from time.time(); no datetime objects per token.
 def create_access_token(sub: str, roles: list[str]) -> str:
-    now = datetime.utcnow()
-    payload = {"sub": sub, "roles": roles, "iat": int(now.timestamp()),
-               "exp": int((now + timedelta(minutes=ACCESS_TTL_MIN)).timestamp())}
-    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALG)
+    now = int(time.time())
+    return _encode({"sub": sub, "roles": roles, "iat": now, "exp": now + ACCESS_TTL_S})
 
 def create_refresh_token(sub: str) -> tuple[str, datetime]:
-    now = datetime.utcnow()
-    exp = now + timedelta(days=REFRESH_TTL_DAYS)
-    payload = {"sub": sub, "type": "refresh", "iat": int(now.timestamp()),
-               "exp": int(exp.timestamp())}
-    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALG), exp
\ No newline at end of file
+    """Returns (token, expiry as naive UTC datetime for RefreshToken.expires_at)."""
+    now = int(time.time())
+    exp = now + REFRESH_TTL_S
+    # jti makes every refresh token unique (and high-entropy) even within the same second
+    payload = {"sub": sub, "type": "refresh", "jti": secrets.token_urlsafe(16),
+               "iat": now, "exp": exp}
+    return _encode(payload), datetime.fromtimestamp(exp, timezone.utc).replace(tzinfo=None)
+
+def normalize_username(username: str) -> str:
+    """Canonical stored form of a username (trimmed, case-folded to lower)."""
+    return username.strip().lower()
+
+def hash_refresh_token(token: str) -> str:
+    """
+    Digest of a refresh token for storage/lookup. Tokens are high-entropy
+    signed values, so a keyed HMAC-SHA256 is enough; no slow KDF needed.
+    """
+    return hmac.new(REFRESH_HASH_SECRET, token.encode("utf-8"), "sha256").hexdigest()
+
+def _b64e(raw: bytes) -> str:
+    return base64.b64encode(raw).decode("ascii")
+
+def _scrypt(plain: str, salt: bytes, n: int, r: int, p: int, dklen: int) -> bytes:
+    # maxmem must cover 128*N*r bytes; give it headroom so larger N still works
+    return hashlib.scrypt(plain.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                          dklen=dklen, maxmem=256 * n * r + (1 << 20))
+
+def hash_password(plain: str) -> str:
+    salt = secrets.token_bytes(SCRYPT_SALT_LEN)
+    key = _scrypt(plain, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P, SCRYPT_DKLEN)
+    return f"{_SCRYPT_PREFIX}{_b64e(salt)}${_b64e(key)}"
+
+_SCRYPT_RE = re.compile(r"scrypt\$(\d+)\$(\d+)\$(\d+)\$([A-Za-z0-9+/=]+)\$([A-Za-z0-9+/=]+)")
+
+@lru_cache(maxsize=8192)
+def _parse_scrypt(encoded: str) -> tuple[int, int, int, bytes, bytes]:
+    """
+    (n, r, p, salt, key) from an encoded scrypt hash; raises ValueError if malformed.
+    Cached per stored string: a user's hash is parsed once, not on every login.
+    A password change produces a new string, so stale entries are simply never hit.
+    """
+    m = _SCRYPT_RE.fullmatch(encoded)
+    if m is None:
+        raise ValueError("malformed scrypt hash")
+    n_s, r_s, p_s, salt_b64, key_b64 = m.groups()
+    return int(n_s), int(r_s), int(p_s), base64.b64decode(salt_b64), base64.b64decode(key_b64)
+
+def _verify_scrypt(plain: str, encoded: str) -> bool:
+    try:
+        n, r, p, salt, key = _parse_scrypt(encoded)
+        test = _scrypt(plain, salt, n, r, p, len(key))
+    except (ValueError, TypeError):
+        return False
+    # compare_digest stays: constant-time in C, unlike any pure-Python int/XOR trick
+    return hmac.compare_digest(test, key)
+
+@lru_cache(maxsize=1)
+def _dummy_hash() -> str:
+    return hash_password(secrets.token_urlsafe(16))
+
+def dummy_verify(plain: str) -> bool:
+    """
+    Spend one full KDF round and return False. Used when there is no usable
+    stored hash (unknown user, inactive account, unknown format) so those
+    paths take as long as a real wrong-password check.
+    """
+    _verify_scrypt(plain, _dummy_hash())
+    return False
+
+def verify_password(plain: str, stored: str | None) -> bool:
+    """Verify against a scrypt hash, or a legacy bcrypt hash."""
+    if stored and stored.startswith("scrypt$"):
+        return _verify_scrypt(plain, stored)
+    if stored and stored.startswith("$2"):
+        # legacy path only: passlib/bcrypt are imported on first use, not at startup
+        from passlib.hash import bcrypt
+        return bcrypt.verify(plain, stored)
+    return dummy_verify(plain)
+
+def needs_rehash(stored: str) -> bool:
+    """True if `stored` is not a scrypt hash with the current parameters."""
+    if not stored.startswith(_SCRYPT_PREFIX):
+        return True
+    try:
+        return len(base64.b64decode(stored.rsplit("$", 1)[1])) != SCRYPT_DKLEN
+    except ValueError:
+        return True
+
+def _verify_cache_key(plain: str, stored: str) -> bytes:
+    return hmac.new(_VERIFY_CACHE_KEY, plain.encode() + b"\0" + stored.encode(), "sha256").digest()
+
+def _verify_cache_hit(key: bytes) -> bool:
+    now = time.monotonic()
+    with _VERIFY_LOCK:
+        exp = _VERIFY_CACHE.get(key)
+        if exp is None:
+            return False
+        if exp > now:
+            _VERIFY_CACHE.move_to_end(key)
+            return True
+        del _VERIFY_CACHE[key]
+        return False
+
+def _verify_cache_put(key: bytes) -> None:
+    with _VERIFY_LOCK:
+        _VERIFY_CACHE[key] = time.monotonic() + VERIFY_CACHE_TTL_S
+        _VERIFY_CACHE.move_to_end(key)
+        while len(_VERIFY_CACHE) > VERIFY_CACHE_MAX:
+            _VERIFY_CACHE.popitem(last=False)
+
+def verify_password_cached(plain: str, stored: str) -> bool:
+    """verify_password with a short-TTL cache of successful results."""
+    if VERIFY_CACHE_TTL_S <= 0:
+        return verify_password(plain, stored)
+    key = _verify_cache_key(plain, stored)
+    if _verify_cache_hit(key):
+        return True
+    if not verify_password(plain, stored):
+        return False
+    _verify_cache_put(key)
+    return True
+
+def _kdf_pool() -> ProcessPoolExecutor | None:
+    global _KDF_POOL
+    if KDF_PROCESSES <= 0:
+        return None
+    if _KDF_POOL is None:
+        with _KDF_POOL_LOCK:
+            if _KDF_POOL is None:
+                # "spawn": forking the multi-threaded server can deadlock in the child
+                _KDF_POOL = ProcessPoolExecutor(
+                    max_workers=KDF_PROCESSES, mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _KDF_POOL
+
+def shutdown_kdf_pool() -> None:
+    """Stop the KDF worker processes (called from the app lifespan)."""
+    global _KDF_POOL
+    with _KDF_POOL_LOCK:
+        pool, _KDF_POOL = _KDF_POOL, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+async def _run_kdf(fn, *args):
+    pool = _kdf_pool()
+    if pool is None:
+        return await run_in_threadpool(fn, *args)
+    return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+
+# Async entry points for routes: the KDF runs off the event loop (threadpool,
+# or the KDF process pool when enabled). Sync callers (bootstrap, CRUD) use the plain ones.
+async def hash_password_async(plain: str) -> str:
+    return await _run_kdf(hash_password, plain)
+
+async def verify_password_async(plain: str, stored: str | None) -> bool:
+    """
+    verify_password off the loop; no stored hash -> dummy KDF, False.
+    The success cache is consulted here in the parent, so it is shared
+    across KDF workers.
+    """
+    if not stored:
+        return await _run_kdf(dummy_verify, plain)
+    if VERIFY_CACHE_TTL_S <= 0:
+        return await _run_kdf(verify_password, plain, stored)
+    key = _verify_cache_key(plain, stored)
+    if _verify_cache_hit(key):
+        return True
+    if not await _run_kdf(verify_password, plain, stored):
+        return False
+    _verify_cache_put(key)
+    return True
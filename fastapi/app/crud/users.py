@@ -1,32 +1,83 @@
 # Path from repo root: fastapi\app\crud\users.py
 from __future__ import annotations
-from typing import Optional, Sequence
-from sqlalchemy.orm import Session
-from sqlalchemy import select
-from app.models.user import User
-from app.core.security import hash_password, verify_password
-from app.schemas.user import UserCreate, UserUpdate
+from typing import Iterator, Optional, Sequence
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import exists, func, or_, select
+from sqlalchemy.exc import IntegrityError
+from app.models.user import User, UserRole
+from app.core.security import dummy_verify, hash_password, verify_password_cached
+from app.schemas.users import UserCreate, UserUpdate
 
 def get_by_id(db: Session, user_id: int) -> Optional[User]:
     return db.get(User, user_id)
 
 def get_by_username(db: Session, username: str) -> Optional[User]:
+    # username -> id memo on the Session: repeat lookups in the same unit of
+    # work become an identity-map get() with no SQL. The username is
+    # re-checked, so a renamed or deleted user just falls through to the SELECT.
+    ids = db.info.setdefault("user_ids_by_name", {})
+    user_id = ids.get(username)
+    if user_id is not None:
+        u = db.get(User, user_id)
+        if u is not None and u.username == username:
+            return u
     stmt = select(User).where(User.username == username)
-    return db.execute(stmt).scalar_one_or_none()
+    u = db.execute(stmt).scalar_one_or_none()
+    if u is not None:
+        ids[username] = u.id
+    return u
+
+def username_taken(db: Session, username: str) -> bool:
+    """True if `username` exists in any letter case (served by uq_users_username_lower)."""
+    return bool(db.scalar(select(exists().where(func.lower(User.username) == username.lower()))))
 
 def get_by_email(db: Session, email: str) -> Optional[User]:
     stmt = select(User).where(User.email == email)
     return db.execute(stmt).scalar_one_or_none()
 
-def list_users(db: Session, skip: int = 0, limit: int = 50) -> Sequence[User]:
-    stmt = select(User).offset(skip).limit(limit)
+def _like_pattern(q: str) -> str:
+    escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def list_users(
+    db: Session, skip: int = 0, limit: int = 50, after_id: int | None = None, q: str | None = None
+) -> Sequence[User]:
+    """
+    One page of users ordered by id. Pass the last id of the previous page as
+    `after_id` (keyset: an index range scan, cost independent of depth); `skip`
+    is the OFFSET fallback for old clients. `q` filters by substring of
+    username/email (trigram GIN indexes serve it on Postgres).
+    """
+    # roles (+ role names) come in with two IN-queries for the whole page, not one per user
+    stmt = (
+        select(User)
+        .options(selectinload(User.roles).selectinload(UserRole.role))
+        .order_by(User.id)
+        .limit(limit)
+    )
+    if q:
+        like = _like_pattern(q)
+        stmt = stmt.where(or_(User.username.ilike(like, escape="\\"), User.email.ilike(like, escape="\\")))
+    if after_id is not None:
+        stmt = stmt.where(User.id > after_id)
+    elif skip:
+        stmt = stmt.offset(skip)
     return db.execute(stmt).scalars().all()
 
+def iter_users(db: Session, chunk: int = 500) -> Iterator[User]:
+    """
+    Every user ordered by id, streamed from a server-side cursor `chunk` rows
+    at a time (bulk export): memory stays at one chunk, not the whole table.
+    """
+    stmt = (
+        select(User)
+        .options(selectinload(User.roles).selectinload(UserRole.role))
+        .order_by(User.id)
+        .execution_options(yield_per=chunk)
+    )
+    yield from db.execute(stmt).scalars()
+
 def create_user(db: Session, data: UserCreate) -> User:
-    if get_by_username(db, data.username):
-        raise ValueError("Username already exists")
-    if data.email and get_by_email(db, data.email):
-        raise ValueError("Email already exists")
     u = User(
         username=data.username,
         email=data.email,
@@ -35,8 +86,21 @@ def create_user(db: Session, data: UserCreate) -> User:
         is_superuser=data.is_superuser,
     )
     db.add(u)
-    db.commit()
-    db.refresh(u)
+    # the unique indexes on username/email do the check: one INSERT on the
+    # happy path; only a conflict pays the SELECT that names the culprit
+    try:
+        db.commit()
+    except IntegrityError as exc:
+        db.rollback()
+        cond = func.lower(User.username) == data.username.lower()
+        if data.email:
+            cond = or_(cond, User.email == data.email)
+        clash = db.execute(select(User.username).where(cond).limit(1)).first()
+        if clash is not None and clash.username.lower() != data.username.lower():
+            raise ValueError("Email already exists") from exc
+        raise ValueError("Username already exists") from exc
+    # no server-side defaults on User: id comes back from the INSERT and the
+    # rest are Python-side values, so no refresh() SELECT is needed
     return u
 
 def update_user(db: Session, user: User, data: UserUpdate) -> User:
@@ -51,9 +115,14 @@ def update_user(db: Session, user: User, data: UserUpdate) -> User:
     if data.password:
         user.password_hash = hash_password(data.password)
 
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    # uniqueness of username/email is left to the unique indexes: no pre-check
+    # SELECT on the common no-conflict path
+    try:
+        db.commit()
+    except IntegrityError as exc:
+        db.rollback()
+        raise ValueError("Username or email already exists") from exc
+    # every column was assigned here in Python: nothing to refresh()
     return user
 
 def delete_user(db: Session, user: User) -> None:
@@ -63,5 +132,7 @@ def delete_user(db: Session, user: User) -> None:
 def authenticate(db: Session, username: str, password: str) -> Optional[User]:
     u = get_by_username(db, username)
     if not u or not u.is_active:
+        dummy_verify(password)  # same KDF cost as a wrong password
         return None
-    return u if verify_password(password, u.password_hash) else None
+    # cache keys cover the stored hash, so a password change never hits a stale entry
+    return u if verify_password_cached(password, u.password_hash) else None
@@ -3,7 +3,7 @@ from __future__ import annotations
 
 import os
 from pathlib import Path
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from sqlalchemy.engine.url import make_url
 from app.core.config import get_settings
@@ -37,15 +37,54 @@ if url.get_backend_name().startswith("sqlite"):
     # Needed on Windows/threaded contexts
     connect_args["check_same_thread"] = False
 
+# ===== Pool sizing (QueuePool) =====
+# Keep connections warm between requests; pre-ping drops dead server-side
+# connections and recycle avoids idle timeouts on networked databases.
+# SQLite is a local file: no pre-ping, no recycling.
+IS_SQLITE = url.get_backend_name().startswith("sqlite")
+pool_kwargs = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_recycle": -1 if IS_SQLITE else settings.DB_POOL_RECYCLE_S,
+    "pool_pre_ping": not IS_SQLITE,
+}
+
 # ===== Engine & Session =====
 engine = create_engine(
     url,               # normalized (absolute) URL if SQLite
     future=True,
     connect_args=connect_args,
     echo=False,        # set True for SQL debug
+    **pool_kwargs,
+)
+
+# ===== SQLite PRAGMAs (per connection) =====
+# WAL + synchronous=NORMAL: commits append to the WAL instead of fsyncing the
+# main file; readers don't block the writer. mmap/cache/temp_store keep hot
+# pages in memory; busy_timeout waits out a concurrent writer instead of failing.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA mmap_size=268435456",  # 256 MiB
+    "PRAGMA cache_size=-65536",    # 64 MiB
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
 )
 
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+def _sqlite_pragmas(dbapi_conn, _record=None) -> None:
+    cur = dbapi_conn.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cur.execute(pragma)
+    finally:
+        cur.close()
+
+if IS_SQLITE:
+    event.listen(engine, "connect", _sqlite_pragmas)
+
+# expire_on_commit=False: objects stay readable after commit without a re-SELECT
+SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False, future=True)
 
 
 class Base(DeclarativeBase):
@@ -3,23 +3,28 @@ from __future__ import annotations
 
 import asyncio
 import contextlib
+import hashlib
+import hmac
+import itertools
 import logging
-import uuid
+import os
+import sys
 from contextlib import asynccontextmanager
 
+import orjson
+
 from fastapi import FastAPI, Request, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
 
 from app.core.config import get_settings
 from app.core.logging_ import setup_logging
 from app.core.errors import register_exception_handlers
-from app.core.path_utils import as_path
+from app.core.responses import OrjsonResponse
 from app.api.routes_auth import router as auth_router
 from app.api.router_inference import router as inference_router
 from app.api.router_plugins import router as plugins_router
@@ -41,17 +46,13 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     # 1) حمّل الموديلات ثم أنشئ الجداول
     try:
+        from app import models  # noqa: F401  (registers every model on app.db.Base)
         from app.db import Base, engine
-        from app.models.user import (
-            User, Role, UserRole,
-            EmailVerificationToken, PasswordResetToken, Invite
-        )
-        Base.metadata.create_all(bind=engine)
+        if settings.DB_CREATE_TABLES:
+            Base.metadata.create_all(bind=engine)
 
         # اختياري: اطبع أسماء الجداول
-        from sqlalchemy import inspect
-        insp = inspect(engine)
-        logger.info("[db] tables at startup: %s", insp.get_table_names())
+        logger.info("[db] %d tables at startup: %s", len(Base.metadata.tables), sorted(Base.metadata.tables))
     except Exception:
         logger.exception("Failed to create tables on startup")
 
@@ -64,14 +65,25 @@ async def lifespan(app: FastAPI):
 
     # 3) (اختياري) Sweeper loop
     task = None
+    pool = None
     try:
         from app.runtime.model_pool import get_model_pool
         pool = get_model_pool()
 
+        # Sleeps until the next model can go idle (or forever while nothing is
+        # loaded); a fresh load wakes it to re-plan. No fixed heartbeat.
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+        pool.on_load(lambda: loop.call_soon_threadsafe(wake.set))
+
         async def sweeper():
             while True:
+                try:
+                    await asyncio.wait_for(wake.wait(), timeout=pool.next_idle_deadline())
+                except TimeoutError:
+                    pass
+                wake.clear()
                 pool.sweep_idle()
-                await asyncio.sleep(60)
 
         task = asyncio.create_task(sweeper())
     except Exception:
@@ -80,6 +92,13 @@ async def lifespan(app: FastAPI):
     try:
         yield
     finally:
+        if pool is not None:
+            pool.on_load(None)
+        from app.core.security import shutdown_kdf_pool
+        shutdown_kdf_pool()
+        pdf_reader = sys.modules.get("app.services.pdf_reader.service")  # only if it was ever used
+        if pdf_reader is not None:
+            pdf_reader.shutdown_pool()
         if task:
             task.cancel()
             with contextlib.suppress(asyncio.CancelledError):
@@ -89,10 +108,6 @@ async def lifespan(app: FastAPI):
 # ===== App init =====
 settings = get_settings()
 
-for name in ("STATIC_DIR", "SAMPLES_DIR", "TEMPLATES_DIR", "UPLOAD_DIR"):
-    if hasattr(settings, name):
-        setattr(settings, name, as_path(getattr(settings, name)))
-
 setup_logging()
 templates = Jinja2Templates(directory=str(settings.TEMPLATES_DIR))
 
@@ -102,6 +117,7 @@ app = FastAPI(
     version=settings.VERSION,
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=OrjsonResponse,  # orjson (C) for every JSON route by default
     swagger_ui_parameters={
         "defaultModelsExpandDepth": (1 if settings.DOCS_SHOW_SCHEMAS else -1),
         "defaultModelExpandDepth": 0,
@@ -125,13 +141,41 @@ app.add_middleware(
 )
 
 # Request ID middleware
-class RequestIDMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request, call_next):
-        rid = request.headers.get("x-request-id") or uuid.uuid4().hex
-        request.state.request_id = rid
-        response = await call_next(request)
-        response.headers["X-Request-ID"] = rid
-        return response
+# IDs only need to be unique, not unpredictable: a random per-process prefix
+# plus a counter (itertools.count is atomic under the GIL) -> 32 hex chars,
+# no urandom syscall or UUID object per request.
+_RID_PREFIX = os.urandom(8).hex()
+_RID_COUNTER = itertools.count()
+
+def _new_request_id() -> str:
+    return f"{_RID_PREFIX}{next(_RID_COUNTER):016x}"
+
+class RequestIDMiddleware:
+    """
+    Plain ASGI middleware (no BaseHTTPMiddleware task group / Request wrapper):
+    exposes the ID as request.state.request_id and echoes it as X-Request-ID.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        rid = None
+        for k, v in scope["headers"]:
+            if k == b"x-request-id":
+                rid = v.decode("latin-1")
+                break
+        rid = rid or _new_request_id()
+        scope.setdefault("state", {})["request_id"] = rid
+        rid_header = (b"x-request-id", rid.encode("latin-1"))
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), rid_header]
+            await send(message)
+
+        await self.app(scope, receive, send_with_id)
 
 app.add_middleware(RequestIDMiddleware)
 
@@ -139,9 +183,24 @@ app.add_middleware(RequestIDMiddleware)
 register_exception_handlers(app)
 
 # Routes
+# index.html depends only on settings.APP_NAME: render it once per process and
+# serve the cached bytes (with an ETag so clients/proxies can revalidate to 304).
+_INDEX_PAGE: tuple[bytes, str] | None = None
+
+def _index_page(request: Request) -> tuple[bytes, str]:
+    global _INDEX_PAGE
+    if _INDEX_PAGE is None:
+        html = templates.get_template("index.html").render(request=request, title=settings.APP_NAME)
+        body = html.encode("utf-8")
+        _INDEX_PAGE = body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    return _INDEX_PAGE
+
 @app.get("/", response_class=HTMLResponse)
 def index(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request, "title": settings.APP_NAME})
+    body, etag = _index_page(request)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return HTMLResponse(body, headers={"ETag": etag})
 
 @app.get("/health")
 def health():
@@ -149,18 +208,28 @@ def health():
 
 EXPOSE_ENV = (settings.ENV != "production") or settings.EXPOSE_ENV_ENDPOINT
 if EXPOSE_ENV:
+    # settings are fixed for the process lifetime: build (and resolve() the
+    # paths of) the summary once, pre-encoded
+    _ENV_SUMMARY_JSON = orjson.dumps(settings.summary())
+
     @app.get("/env", include_in_schema=(settings.ENV != "production"))
     def env(x_admin_token: str | None = Header(default=None, alias="X-Admin-Token")):
         if settings.ENV == "production":
             expected = settings.ENV_SECRET_TOKEN
-            if expected and x_admin_token != expected:
+            # constant-time compare (C), so the token can't be probed byte by byte via timing
+            if expected and not hmac.compare_digest((x_admin_token or "").encode(), expected.encode()):
                 raise HTTPException(status_code=403, detail="Forbidden")
-        return settings.summary()
+        return Response(_ENV_SUMMARY_JSON, media_type="application/json")
+
+# Favicons are tiny and requested constantly: read once at startup, serve from memory.
+_FAVICON_PATH = settings.STATIC_DIR / "favicon.ico"
+_FAVICON = _FAVICON_PATH.read_bytes() if _FAVICON_PATH.is_file() else None
 
 @app.get("/favicon.ico", include_in_schema=False)
 def favicon():
-    p = settings.STATIC_DIR / "favicon.ico"
-    return FileResponse(str(p)) if p.is_file() else Response(status_code=204)
+    if _FAVICON is None:
+        return Response(status_code=204)
+    return Response(_FAVICON, media_type="image/x-icon", headers={"Cache-Control": "public, max-age=86400"})
 
 # Include routers
 app.include_router(auth_router)
@@ -172,23 +241,22 @@ app.include_router(inference_router)
 app.include_router(users_router) 
 
 # OpenAPI enrichment (اختياري)
+def _manifest_tasks(manifest) -> tuple | list | set:
+    t = manifest.get("tasks") if isinstance(manifest, dict) else None
+    return t if isinstance(t, (list, tuple, set)) else ()
+
 def _collect_plugins_and_tasks():
     try:
         registry = list_plugins()
     except Exception as e:
         logger.warning("Could not fetch plugin list for OpenAPI: %s", e)
         return [], []
-    plugin_names, tasks = [], set()
     if isinstance(registry, dict):
-        plugin_names = list(registry.keys())
-        for manifest in registry.values():
-            if isinstance(manifest, dict):
-                t = manifest.get("tasks")
-                if isinstance(t, (list, tuple, set)):
-                    tasks.update(t)
-    elif isinstance(registry, (list, tuple, set)):
-        plugin_names = list(registry)
-    return sorted(set(plugin_names)), sorted(tasks)
+        tasks = {t for manifest in registry.values() for t in _manifest_tasks(manifest)}
+        return sorted(registry), sorted(tasks)  # dict keys are already unique
+    if isinstance(registry, (list, tuple, set)):
+        return sorted(set(registry)), []
+    return [], []
 
 def custom_openapi():
     if app.openapi_schema:
@@ -215,4 +283,24 @@ def custom_openapi():
     app.openapi_schema = schema
     return app.openapi_schema
 
-app.openapi = custom_openapi
\ No newline at end of file
+app.openapi = custom_openapi
+
+# /openapi.json: the schema is fixed once routes are registered, so encode it
+# once (orjson) and serve the bytes with an ETag instead of re-encoding per hit.
+def _openapi_bytes() -> tuple[bytes, str]:
+    cached = getattr(app.state, "openapi_bytes", None)
+    if cached is None:
+        body = orjson.dumps(app.openapi())
+        cached = body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        app.state.openapi_bytes = cached
+    return cached
+
+if app.openapi_url:
+    app.router.routes = [r for r in app.router.routes if getattr(r, "path", None) != app.openapi_url]
+
+    @app.get(app.openapi_url, include_in_schema=False)
+    def openapi_json(request: Request):
+        body, etag = _openapi_bytes()
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(body, media_type="application/json", headers={"ETag": etag})
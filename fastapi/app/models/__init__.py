@@ -1 +1,12 @@
 # Path from repo root: fastapi\app\models\__init__.py
+from app.db import Base
+from .user import Invite, RefreshToken, Role, User, UserRole
+
+__all__ = [
+    "Base",
+    "Invite",
+    "RefreshToken",
+    "Role",
+    "User",
+    "UserRole",
+]
@@ -4,11 +4,10 @@ from __future__ import annotations
 from datetime import datetime, timedelta
 from typing import Optional
 from sqlalchemy import (
-    Boolean, Column, DateTime, ForeignKey, Integer, String, UniqueConstraint, Text
+    Boolean, Column, DateTime, ForeignKey, Index, Integer, String, UniqueConstraint, Text, func
 )
-from sqlalchemy.orm import relationship, Mapped, mapped_column, declarative_base
-
-Base = declarative_base()
+from sqlalchemy.orm import relationship, Mapped, mapped_column
+from app.db import Base  # the one metadata that create_all/alembic see
 
 class User(Base):
     __tablename__ = "users"
@@ -22,6 +21,9 @@ class User(Base):
 
     roles = relationship("UserRole", back_populates="user", cascade="all, delete-orphan")
 
+# usernames are unique case-insensitively: "Alice" (a legacy row) blocks "alice"
+Index("uq_users_username_lower", func.lower(User.username), unique=True)
+
 class Role(Base):
     __tablename__ = "roles"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
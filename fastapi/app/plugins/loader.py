@@ -2,7 +2,6 @@
 from __future__ import annotations
 
 import importlib
-import json
 import pkgutil
 from collections.abc import Iterable
 from dataclasses import dataclass
@@ -10,6 +9,8 @@ from pathlib import Path
 from types import ModuleType
 from typing import Any
 
+import orjson
+
 
 # ----------------------------
 # Registry & lightweight proxy
@@ -56,7 +57,7 @@ def _read_manifest(pkg_name: str) -> dict:
         pkg_path = Path(getattr(pkg, "__file__", "")).parent
         mf = pkg_path / "manifest.json"
         if mf.is_file():
-            return json.loads(mf.read_text(encoding="utf-8"))
+            return orjson.loads(mf.read_bytes())
     except Exception:
         pass
     return {}
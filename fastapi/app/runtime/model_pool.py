@@ -25,6 +25,11 @@ class ModelPool:
         self.idle_unload_s = idle_unload_s
         self.pool: OrderedDict[str, dict] = OrderedDict()  # name -> {"model": obj, "last": ts}
         self.lock = threading.Lock()
+        self._on_load: Callable[[], None] | None = None
+
+    def on_load(self, callback: Callable[[], None] | None) -> None:
+        """Register a callback run (under no lock) after a model is newly loaded."""
+        self._on_load = callback
 
     def get(self, name: str, factory: Callable[[], Any]):
         """
@@ -49,7 +54,23 @@ class ModelPool:
                 self._safe_del(item.get("model"))
 
             self._empty_cuda_cache()
-            return model
+        if self._on_load is not None:
+            self._on_load()
+        return model
+
+    def next_idle_deadline(self) -> float | None:
+        """
+        Seconds until the least recently used model crosses the idle TTL,
+        or None when nothing can expire (empty pool or unloading disabled).
+        """
+        if self.idle_unload_s <= 0:
+            return None
+        with self.lock:
+            if not self.pool:
+                return None
+            oldest = min(v["last"] for v in self.pool.values())
+        # +1s slack so a slightly early timer wake-up doesn't sweep for nothing
+        return max(0.0, oldest + self.idle_unload_s - time.time()) + 1.0
 
     def sweep_idle(self):
         """
@@ -59,7 +80,7 @@ class ModelPool:
             return
         now = time.time()
         with self.lock:
-            to_drop = [k for k, v in self.pool.items() if now - v["last"] > self.idle_unload_s]
+            to_drop = [k for k, v in self.pool.items() if now - v["last"] >= self.idle_unload_s]
             for k in to_drop:
                 item = self.pool.pop(k)
                 self._safe_del(item.get("model"))
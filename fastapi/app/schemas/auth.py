@@ -1,11 +1,15 @@
 # Path from repo root: fastapi\app\schemas\auth.py
 from __future__ import annotations
 
-from typing import List, Optional
-from pydantic import BaseModel, EmailStr, constr
+from typing import Optional
+from pydantic import BaseModel, ConfigDict, constr
+
+from app.schemas.users import UserOut  # noqa: F401  (one UserOut; re-exported for old imports)
 
 
 class LoginIn(BaseModel):
+    model_config = ConfigDict(strict=True, extra="forbid", frozen=True)
+
     username: str  # can be username or email
     password: str
 
@@ -16,14 +20,7 @@ class TokenPair(BaseModel):
     token_type: str = "bearer"
 
 
-class UserOut(BaseModel):
-    id: int
-    username: str
-    email: EmailStr
-    is_active: bool
-    is_superuser: bool
-    roles: List[str] = []
-
-
 class RefreshIn(BaseModel):
+    model_config = ConfigDict(strict=True, extra="forbid", frozen=True)
+
     refresh_token: str
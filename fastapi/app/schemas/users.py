@@ -1,7 +1,7 @@
 # Path from repo root: fastapi\app\schemas\users.py
 from __future__ import annotations
-from typing import Optional
-from pydantic import BaseModel, EmailStr, Field
+from typing import Any, Optional
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
 
 # Shared properties
 class UserBase(BaseModel):
@@ -10,12 +10,20 @@ class UserBase(BaseModel):
     is_active: bool = True
     is_superuser: bool = False
 
+# Inputs: no coercion (a JSON 123 is not a username), unknown keys rejected
+_INPUT_CONFIG = ConfigDict(strict=True, extra="forbid", frozen=True)
+
 # Create
 class UserCreate(UserBase):
+    model_config = _INPUT_CONFIG
+
     password: str = Field(..., min_length=6, max_length=128)
+    roles: list[str] = []  # role names; missing roles are created (POST /users)
 
 # Update (partial)
 class UserUpdate(BaseModel):
+    model_config = _INPUT_CONFIG
+
     username: Optional[str] = Field(None, min_length=3, max_length=64)
     email: Optional[EmailStr] = None
     is_active: Optional[bool] = None
@@ -24,7 +32,24 @@ class UserUpdate(BaseModel):
 
 # DB → API (out)
 class UserOut(UserBase):
+    model_config = ConfigDict(from_attributes=True)  # SQLAlchemy compatibility
+
     id: int
+    roles: list[str] = []
 
-    class Config:
-        from_attributes = True  # SQLAlchemy compatibility
+    @field_validator("roles", mode="before")
+    @classmethod
+    def _role_names(cls, v: Any) -> Any:
+        # User.roles holds UserRole association rows; expose just the names
+        return [getattr(getattr(r, "role", None), "name", r) for r in v or ()]
+
+# One page of users; pass next_after back as ?after_id= for the following page
+class UserPage(BaseModel):
+    items: list[UserOut]
+    next_after: Optional[int] = None
+
+class RoleOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: str
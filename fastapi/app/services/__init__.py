@@ -1,9 +1,13 @@
 # Path from repo root: fastapi\app\services\__init__.py
-from .base import BaseService
-from ._utils_upload import list_services, get_service_instance
-
+# Lazy (PEP 562): importing app.services.<name> doesn't pull in anything else.
 __all__ = [
     "BaseService",
-    "list_services",
-    "get_service_instance",
 ]
+
+
+def __getattr__(name: str):
+    if name == "BaseService":
+        from .base import BaseService
+
+        return BaseService
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
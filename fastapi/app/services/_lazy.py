@@ -0,0 +1,26 @@
+# Path from repo root: fastapi\app\services\_lazy.py
+from __future__ import annotations
+import importlib
+import sys
+from typing import Any, Callable
+
+
+def lazy_service(package: str, *, tasks: bool = True) -> Callable[[str], Any]:
+    """
+    Module __getattr__ (PEP 562) for a service package: `Service` (and `TASKS`,
+    from Service.tasks) load from <package>.service on first access, not on
+    package import. Usage in the package's __init__: __getattr__ = lazy_service(__name__)
+    """
+    names = ("Service", "TASKS") if tasks else ("Service",)
+
+    def __getattr__(attr: str) -> Any:
+        if attr in names:
+            service = importlib.import_module(".service", package).Service
+            mod = sys.modules[package]
+            mod.Service = service  # cached: later lookups skip __getattr__
+            if tasks:
+                mod.TASKS = getattr(service, "tasks", [])
+            return getattr(mod, attr)
+        raise AttributeError(f"module {package!r} has no attribute {attr!r}")
+
+    return __getattr__
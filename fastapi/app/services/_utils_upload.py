@@ -1,36 +1,181 @@
 # Path from repo root: fastapi\app\services\_utils_upload.py
 from __future__ import annotations
-import base64
+import binascii
 import hashlib
+import os
+import string
+import uuid
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Union
 
+try:  # SIMD base64 (libbase64: AVX2/AVX-512/NEON picked at runtime)
+    import pybase64
+except Exception:
+    pybase64 = None
 
 UPLOADS_ROOT = Path("uploads")
 
-def strip_data_url(b64: str) -> str:
-    if "," in b64 and ";base64" in b64[:128]:
-        return b64.split(",", 1)[1]
-    return b64
+def _lit(b64: Union[str, bytes], s: str) -> Union[str, bytes]:
+    # literal of the payload's own type: str and bytes payloads are searched without converting them
+    return s if isinstance(b64, str) else s.encode("ascii")
 
-def b64_to_bytes(b64: str) -> bytes:
-    return base64.b64decode(strip_data_url(b64), validate=False)
+def _b64_start(b64: Union[str, bytes]) -> int:
+    """Offset of the base64 body: past a data: URL header, which sits in the first 128 chars."""
+    comma = b64.find(_lit(b64, ","), 0, 128)
+    if comma != -1 and _lit(b64, ";base64") in b64[:comma]:
+        return comma + 1
+    return 0
 
-def sha256_hex(data: bytes) -> str:
-    import hashlib
-    return hashlib.sha256(data).hexdigest()
+def _b64_decode(body) -> bytes:
+    # same lenient decode as b64decode(validate=False): non-alphabet chars are skipped
+    if pybase64 is not None:
+        return pybase64.b64decode(body, validate=False)
+    return binascii.a2b_base64(body)
 
-def ym_subdir(root: Path) -> Path:
-    now = datetime.now()
-    sub = root / f"{now:%Y}" / f"{now:%m}"
+_B64_WS = b" \t\r\n"
+# every byte b64decode(validate=False) skips: dropped before the quanta are counted
+_B64_ALPHABET = frozenset(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=")
+_B64_NON_ALPHABET = bytes(c for c in range(256) if c not in _B64_ALPHABET)
+
+def b64_size(b64: Union[str, bytes]) -> Optional[int]:
+    """
+    Decoded size computed from the length alone, without decoding; None when
+    that isn't exact (line-wrapped or malformed base64) and only decoding can tell.
+    """
+    start = _b64_start(b64)
+    n = len(b64) - start
+    if n % 4:
+        return None
+    for ws in _B64_WS:  # any whitespace: the length overstates the payload
+        if _lit(b64, chr(ws)) in b64:
+            return None
+    return n // 4 * 3 - b64[max(start, len(b64) - 2):].count(_lit(b64, "="))
+
+def b64_peek(b64: Union[str, bytes], n: int) -> bytes:
+    """
+    First ~n decoded bytes, decoding only the matching prefix of the payload
+    (enough for magic checks before paying for the full decode).
+    """
+    start = _b64_start(b64)
+    k = (n + 2) // 3 * 4
+    head = b64[start:start + k + k // 2]  # slack for line breaks / skipped chars
+    if isinstance(head, str):
+        head = head.encode("ascii")
+    head = head.translate(None, _B64_NON_ALPHABET)
+    return _b64_decode(head[:min(len(head), k) // 4 * 4])
+
+# bound once: OpenSSL's sha256 (SHA-NI / AVX2 code paths where the CPU reports
+# them, e.g. sha_ni in /proc/cpuinfo); it releases the GIL on large buffers
+_sha256 = hashlib.sha256
+
+# encoded chars per streaming pass (a multiple of 4: each pass decodes whole quanta)
+B64_STREAM_CHUNK = 3 * 1024 * 1024
+
+class PayloadTooLarge(ValueError):
+    """Decoded upload passed the caller's max_bytes while streaming."""
+
+def decode_hash_write(b64: Union[str, bytes], path: Path, max_bytes: int) -> tuple[int, str]:
+    """
+    Decode `b64` into `path` chunk by chunk, hashing each decoded chunk as it is
+    written: the payload is never held decoded in full, and every byte is
+    touched once. Returns (size, sha256 hex). Raises PayloadTooLarge past
+    `max_bytes`, ValueError on bad base64; `path` is removed on any error.
+    """
+    h = _sha256()
+    size = 0
+    end = len(b64)
+    carry = b""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+    try:
+        try:
+            for pos in range(_b64_start(b64), end, B64_STREAM_CHUNK):
+                chunk = b64[pos:pos + B64_STREAM_CHUNK]
+                if isinstance(chunk, str):
+                    chunk = chunk.encode("ascii")
+                chunk = carry + chunk.translate(None, _B64_NON_ALPHABET)
+                # skipped chars (line breaks, stray junk) shift the quanta: hold a partial one back
+                cut = len(chunk) if pos + B64_STREAM_CHUNK >= end else len(chunk) // 4 * 4
+                carry = chunk[cut:]
+                data = _b64_decode(memoryview(chunk)[:cut])
+                size += len(data)
+                if size > max_bytes:
+                    raise PayloadTooLarge(f"> {max_bytes} bytes")
+                h.update(data)
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return size, h.hexdigest()
+
+def stage_path(subdir: Path) -> Path:
+    """Staging file for an upload whose final (content-addressed) name isn't known yet."""
+    return subdir / f".{uuid.uuid4().hex}.part"
+
+def place_by_digest(tmp: Path, subdir: Path, sha: str, ext: str) -> Path:
+    """Move a staged upload to <subdir>/<sha16><ext>; identical content already there wins."""
+    path = subdir / f"{sha[:16]}{ext}"
+    if path.exists():
+        tmp.unlink()
+    else:
+        os.replace(tmp, path)
+    return path
+
+def stage_b64(b64: Union[str, bytes], root: Path, max_bytes: int) -> tuple[Path, Path, int, str]:
+    """decode_hash_write into a staging file under root/YYYY/MM. Returns (subdir, tmp, size, sha256 hex)."""
+    subdir = ym_subdir(root)
+    tmp = stage_path(subdir)
+    try:
+        size, sha = decode_hash_write(b64, tmp, max_bytes)
+    except FileNotFoundError:
+        # the cached month dir was removed at runtime (cleanup job, remount): forget it and recreate once
+        _ym_dir.cache_clear()
+        subdir = ym_subdir(root)
+        tmp = stage_path(subdir)
+        size, sha = decode_hash_write(b64, tmp, max_bytes)
+    return subdir, tmp, size, sha
+
+def save_b64(b64: Union[str, bytes], root: Path, ext: str, max_bytes: int) -> tuple[Path, int, str]:
+    """stage_b64, then place_by_digest. Returns (path, size, sha256 hex)."""
+    subdir, tmp, size, sha = stage_b64(b64, root, max_bytes)
+    return place_by_digest(tmp, subdir, sha, ext), size, sha
+
+@lru_cache(maxsize=128)
+def ensure_dir(path: Path) -> Path:
+    # mkdir once per process: services are constructed per request by /services/{name}.
+    # A root removed later is harmless: ym_subdir recreates it (parents=True) on demand
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+@lru_cache(maxsize=128)
+def _ym_dir(root: Path, year: int, month: int) -> Path:
+    sub = root / f"{year:04d}" / f"{month:02d}"
     sub.mkdir(parents=True, exist_ok=True)
     return sub
 
+def ym_subdir(root: Path) -> Path:
+    # (root, year, month) keyed LRU: mkdir runs once per month per root, not per upload;
+    # stage_b64 clears it if the directory disappears underneath
+    now = datetime.now()
+    return _ym_dir(root, now.year, now.month)
+
+# ASCII characters ensure_ext keeps; every other ASCII char is dropped by one C-level translate()
+_EXT_ALLOWED = frozenset(string.ascii_lowercase + string.digits + "._-")
+_EXT_TRANS = str.maketrans("", "", "".join(chr(i) for i in range(128) if chr(i) not in _EXT_ALLOWED))
+
 def ensure_ext(ext: Optional[str], default_ext: str) -> str:
     if not ext:
         ext = default_ext
     ext = ext.strip().lower()
     if not ext.startswith("."):
         ext = "." + ext
-    return "".join(ch for ch in ext if ch.isalnum() or ch in "._-").replace("..", ".")
\ No newline at end of file
+    if ext.isascii():
+        ext = ext.translate(_EXT_TRANS)
+    else:  # non-ASCII letters/digits are kept too (str.isalnum), as before
+        ext = "".join(ch for ch in ext if ch.isalnum() or ch in "._-")
+    return ext.replace("..", ".")
\ No newline at end of file
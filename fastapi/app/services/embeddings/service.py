@@ -4,33 +4,67 @@ from __future__ import annotations
 import os
 import json
 import math
-from typing import Any, Dict, List, Optional, Sequence, Tuple
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from app.services.base import BaseService
 
-# ========== Imports الآمنة ==========
-try:
-    import torch
-except Exception:
-    torch = None
+# ========== Imports الآمنة (كسولة) ==========
+# torch / sentence-transformers / psycopg ثقيلة: تُستورد عند أول Service() فقط،
+# فقراءة tasks أو استيراد الحزمة لا يجرّها إلى الذاكرة.
+torch = None
+SentenceTransformer = None
+psycopg = None
+dict_row = None
+ConnectionPool = None
+register_vector = None  # numpy <-> vector بالصيغة الثنائية (بدون تحويل نصي لكل عنصر)
+_DEPS_LOADED = False
 
-try:
-    from sentence_transformers import SentenceTransformer
-except Exception:
-    SentenceTransformer = None
 
-try:
-    import psycopg
-    from psycopg.rows import dict_row
-except Exception:
-    psycopg = None
-    dict_row = None
+def _load_deps() -> None:
+    global torch, SentenceTransformer, psycopg, dict_row, ConnectionPool, register_vector, _DEPS_LOADED
+    if _DEPS_LOADED:
+        return
+    try:
+        import torch as _torch
+        torch = _torch
+    except Exception:
+        pass
+    try:
+        from sentence_transformers import SentenceTransformer as _ST
+        SentenceTransformer = _ST
+    except Exception:
+        pass
+    try:
+        import psycopg as _psycopg
+        from psycopg.rows import dict_row as _dict_row
+        psycopg, dict_row = _psycopg, _dict_row
+    except Exception:
+        pass
+    try:
+        from psycopg_pool import ConnectionPool as _Pool
+        ConnectionPool = _Pool
+    except Exception:
+        pass
+    try:
+        from pgvector.psycopg import register_vector as _register_vector
+        register_vector = _register_vector
+    except Exception:
+        pass
+    _DEPS_LOADED = True
 
 
 # ========== إعدادات عامة ==========
 DEFAULT_MODEL_NAME = os.getenv("EMBEDDINGS_MODEL", "intfloat/multilingual-e5-base")
 EMBED_DIM = int(os.getenv("EMBEDDINGS_DIM", "768"))  # غيّرها لو اخترت نموذج أبعاد مختلفة
+EMBED_BATCH_SIZE = int(os.getenv("EMBEDDINGS_BATCH_SIZE", "64"))
+QUERY_CACHE_SIZE = int(os.getenv("EMBEDDINGS_QUERY_CACHE", "1024"))  # 0 = بدون cache
+# torch.compile للـ transformer على GPU (اختياري): يقلّل overhead إطلاق الـ kernels للدفعات الصغيرة
+EMBED_COMPILE = os.getenv("EMBEDDINGS_COMPILE", "0").lower() in {"1", "true", "yes"}
 DATABASE_URL = os.getenv("DATABASE_URL")
+POOL_MIN_SIZE = int(os.getenv("EMBEDDINGS_POOL_MIN", "2"))
+POOL_MAX_SIZE = int(os.getenv("EMBEDDINGS_POOL_MAX", "10"))
 
 # جداول / أسماء
 EXTENSION_SQL = "CREATE EXTENSION IF NOT EXISTS vector;"
@@ -50,10 +84,58 @@ CREATE TABLE IF NOT EXISTS doc_chunks (
 # فهرس تقريب تقارب (HNSW) – يتطلب pgvector >= 0.5.0
 INDEX_SQL = "CREATE INDEX IF NOT EXISTS idx_doc_chunks_emb_hnsw ON doc_chunks USING hnsw (embedding vector_cosine_ops);"
 
+UPSERT_SQL = """
+INSERT INTO doc_chunks (id, doc_id, rel_path, mime, hash, page, text, embedding)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s::vector)
+ON CONFLICT (id) DO UPDATE SET
+  doc_id = EXCLUDED.doc_id,
+  rel_path = EXCLUDED.rel_path,
+  mime = EXCLUDED.mime,
+  hash = EXCLUDED.hash,
+  page = EXCLUDED.page,
+  text = EXCLUDED.text,
+  embedding = EXCLUDED.embedding;
+"""
+
+
+@lru_cache(maxsize=1)
+def _get_pool():
+    """ConnectionPool مشترك (يُنشأ مرة واحدة)؛ None إن لم تكن psycopg_pool مثبتة."""
+    if ConnectionPool is None:
+        return None
+    return ConnectionPool(
+        DATABASE_URL,
+        min_size=POOL_MIN_SIZE,
+        max_size=POOL_MAX_SIZE,
+        kwargs={"row_factory": dict_row},
+        configure=register_vector,  # مرة لكل اتصال جديد بدل كل طلب
+        open=True,
+    )
 
-def _as_vector_literal(vec: Sequence[float]) -> str:
-    # صيغة pgvector: '[0.12, -0.3, ...]'
-    return "[" + ",".join(f"{float(x):.6f}" for x in vec) + "]"
+
+@contextmanager
+def _connect() -> Iterator[Any]:
+    """اتصال من الـ pool إن وُجد، وإلا اتصال جديد (السلوك القديم)."""
+    pool = _get_pool()
+    if pool is not None:
+        with pool.connection() as conn:
+            yield conn
+        return
+    with psycopg.connect(DATABASE_URL, row_factory=dict_row) as conn:
+        if register_vector is not None:
+            register_vector(conn)
+        yield conn
+
+
+def _vector_params(embs) -> List[Any]:
+    """
+    قيم المعاملات لصفوف ndarray (n, dim) float32:
+      - مع pgvector: الصفوف نفسها → الصيغة الثنائية (4 بايت/بُعد، بدون تنسيق نصي)
+      - بدونه: نص '[0.12, -0.3, ...]' عبر repr في C (str(list)) بدل f-string لكل عنصر
+    """
+    if register_vector is not None:
+        return list(embs)
+    return [str(v) for v in embs.tolist()]
 
 
 class Service(BaseService):
@@ -64,8 +146,10 @@ class Service(BaseService):
     """
     name = "embeddings"
     tasks = ["upsert", "search"]
+    _schema_ready = False
 
     def __init__(self) -> None:
+        _load_deps()
         # تحميل النموذج عند إنشاء الخدمة (مرة واحدة)
         if SentenceTransformer is None:
             raise RuntimeError("sentence-transformers غير مثبت. ثبّت: pip install sentence-transformers")
@@ -73,7 +157,15 @@ class Service(BaseService):
         self.model = SentenceTransformer(DEFAULT_MODEL_NAME)
         # استعمل GPU لو متاح (اختياري)
         if torch is not None and torch.cuda.is_available():
-            self.model = self.model.to("cuda")
+            # FP16 على GPU: نصف عرض النطاق للذاكرة وتستفيد من tensor cores
+            self.model = self.model.to("cuda").half()
+            torch.set_float32_matmul_precision("high")
+            if EMBED_COMPILE:
+                self._compile_model()
+
+        # cache لمتجهات الاستعلامات المتكررة (autocomplete / إعادة المحاولة): بدون forward pass
+        if QUERY_CACHE_SIZE > 0:
+            self._query_vector = lru_cache(maxsize=QUERY_CACHE_SIZE)(self._query_vector)
 
         if psycopg is None:
             raise RuntimeError("psycopg غير مثبت. ثبّت: pip install 'psycopg[binary]'")
@@ -81,13 +173,54 @@ class Service(BaseService):
         if not DATABASE_URL:
             raise RuntimeError("DATABASE_URL غير معرّف في البيئة.")
 
-        # تهيئة قاعدة البيانات (امتداد + جدول + فهرس)
-        with psycopg.connect(DATABASE_URL, row_factory=dict_row) as conn:
-            with conn.cursor() as cur:
-                cur.execute(EXTENSION_SQL)
-                cur.execute(TABLE_SQL)
-                cur.execute(INDEX_SQL)
-            conn.commit()
+        # تهيئة قاعدة البيانات (امتداد + جدول + فهرس) — مرة واحدة لكل عملية
+        # (اتصال مباشر: register_vector في الـ pool يحتاج الامتداد موجوداً أولاً)
+        if not Service._schema_ready:
+            with psycopg.connect(DATABASE_URL, row_factory=dict_row) as conn:
+                with conn.cursor() as cur:
+                    cur.execute(EXTENSION_SQL)
+                    cur.execute(TABLE_SQL)
+                    cur.execute(INDEX_SQL)
+                conn.commit()
+            Service._schema_ready = True
+
+    def _compile_model(self) -> None:
+        """
+        يلفّ الـ transformer الداخلي بـ torch.compile (CUDA graphs)، ثم encode تجريبي
+        حتى لا يدفع أول طلب حقيقي زمن الـ JIT. عند الفشل يبقى النموذج كما هو.
+        """
+        first = self.model[0]
+        auto_model = getattr(first, "auto_model", None)
+        if auto_model is None or not hasattr(torch, "compile"):
+            return
+        try:
+            first.auto_model = torch.compile(auto_model, mode="reduce-overhead", fullgraph=False)
+            self._encode(["warmup"])
+        except Exception:
+            first.auto_model = auto_model
+
+    def _encode(self, texts: List[str]):
+        """
+        ndarray (n, dim) float32 بطول L2 = 1 (normalize داخل النموذج على الجهاز،
+        فالكوزاين في pgvector يعطي نفس الترتيب). batch ثابت، بدون progress bar.
+        """
+        # inference_mode أرخص من no_grad (لا version counters للـ tensors)
+        with torch.inference_mode() if torch is not None else nullcontext():
+            embs = self.model.encode(
+                texts,
+                batch_size=EMBED_BATCH_SIZE,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            )
+        return embs.astype("float32", copy=False)  # fp16 على GPU → float32 لـ pgvector
+
+    def _query_vector(self, query: str) -> Any:
+        """قيمة معامل متجه الاستعلام (مُغلّفة بـ lru_cache لكل مثيل في __init__)."""
+        vec = _vector_params(self._encode([query]))[0]
+        if hasattr(vec, "setflags"):
+            vec.setflags(write=False)  # مشترك بين الطلبات عبر الـ cache
+        return vec
 
     # -------------------------
     #          API
@@ -130,31 +263,21 @@ class Service(BaseService):
 
         # حساب embeddings
         # e5-base يحب صيغة "query: ..." و "passage: ..." عادةً، لكن للبساطة سنأخذ النص كما هو.
-        embs: List[List[float]] = self.model.encode(texts, convert_to_numpy=True).tolist()
+        embs = self._encode(texts)  # ndarray (n, dim)
 
-        # upsert إلى PostgreSQL
-        inserted = 0
-        with psycopg.connect(DATABASE_URL, row_factory=dict_row) as conn:
+        # upsert إلى PostgreSQL: executemany واحد (psycopg يرسلها كـ pipeline) بدل INSERT لكل صف
+        with _connect() as conn:
+            vecs = _vector_params(embs)
             with conn.cursor() as cur:
-                for row, vec in zip(rows, embs):
-                    vec_lit = _as_vector_literal(vec)
-                    cur.execute(
-                        """
-                        INSERT INTO doc_chunks (id, doc_id, rel_path, mime, hash, page, text, embedding)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s::vector)
-                        ON CONFLICT (id) DO UPDATE SET
-                          doc_id = EXCLUDED.doc_id,
-                          rel_path = EXCLUDED.rel_path,
-                          mime = EXCLUDED.mime,
-                          hash = EXCLUDED.hash,
-                          page = EXCLUDED.page,
-                          text = EXCLUDED.text,
-                          embedding = EXCLUDED.embedding;
-                        """,
-                        (row["id"], row["doc_id"], row["rel_path"], row["mime"], row["hash"], row["page"], row["text"], vec_lit),
-                    )
-                    inserted += 1
+                cur.executemany(
+                    UPSERT_SQL,
+                    [
+                        (r["id"], r["doc_id"], r["rel_path"], r["mime"], r["hash"], r["page"], r["text"], v)
+                        for r, v in zip(rows, vecs)
+                    ],
+                )
             conn.commit()
+        inserted = len(rows)
 
         return {"ok": True, "upserted": inserted, "model": DEFAULT_MODEL_NAME, "dim": EMBED_DIM}
 
@@ -174,9 +297,8 @@ class Service(BaseService):
         top_k = int((payload or {}).get("top_k") or 5)
         top_k = max(1, min(top_k, 100))
 
-        # حساب embedding للاستعلام
-        q_vec = self.model.encode([query], convert_to_numpy=True)[0].tolist()
-        q_lit = _as_vector_literal(q_vec)
+        # حساب embedding للاستعلام؛ المفتاح مُطبّع (مسافات زائدة لا تغيّر التوكنات)
+        q_vec = self._query_vector(" ".join(str(query).split()))
 
         where = []
         params: List[Any] = []
@@ -201,9 +323,9 @@ class Service(BaseService):
         """
 
         results: List[Dict[str, Any]] = []
-        with psycopg.connect(DATABASE_URL, row_factory=dict_row) as conn:
+        with _connect() as conn:
             with conn.cursor() as cur:
-                cur.execute(sql, [q_lit, q_lit, *params] if params else [q_lit, q_lit])
+                cur.execute(sql, [q_vec, q_vec, *params])
                 for row in cur.fetchall():
                     results.append(row)
 
@@ -2,10 +2,12 @@
 from __future__ import annotations
 from pathlib import Path
 from typing import Any, Optional
-import base64, mimetypes
+import base64, hashlib, mimetypes
 
 from app.services.base import BaseService
-from app.services._utils_upload import sha256_hex  # لديك مسبقًا
+
+# 48 KiB: a multiple of 3, so each chunk encodes without "=" padding mid-stream
+B64_CHUNK = 3 * 16384
 
 TASKS = ["make_b64_payload"]
 def get_tasks() -> list[str]: return TASKS
@@ -38,24 +40,29 @@ class Service(BaseService):
         if not file_path.is_file():
             return {"ok": False, "error": f"file not found: {file_path}"}
 
-        data = file_path.read_bytes()
-        if len(data) == 0:
-            return {"ok": False, "error": "empty file"}
-
         # استنتاج الـ MIME
         mime = payload.get("mime")
         if not mime:
             guessed, _ = mimetypes.guess_type(str(file_path))
             mime = guessed or "application/octet-stream"
 
-        b64 = base64.b64encode(data).decode("utf-8")
-        content_b64 = (f"data:{mime};base64,{b64}") if add_prefix else b64
+        # مرور واحد على الملف: sha256 و base64 معًا، بدون نسخة كاملة من الملف في الذاكرة
+        buf = bytearray(f"data:{mime};base64,".encode("ascii") if add_prefix else b"")
+        h = hashlib.sha256()
+        size = 0
+        with file_path.open("rb") as f:
+            while chunk := f.read(B64_CHUNK):
+                size += len(chunk)
+                h.update(chunk)
+                buf += base64.b64encode(chunk)
+        if size == 0:
+            return {"ok": False, "error": "empty file"}
 
         return {
             "ok": True,
-            "content_b64": content_b64,
-            "size": len(data),
-            "sha256": sha256_hex(data),
+            "content_b64": buf.decode("ascii"),
+            "size": size,
+            "sha256": h.hexdigest(),
             "mime": mime,
             "filename": file_path.name,
         }
\ No newline at end of file
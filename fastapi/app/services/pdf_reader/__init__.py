@@ -1,9 +1,9 @@
-# Path from repo root: fastapi\app\services\dummy\__init__.py
-from .service import Service
+# Path from repo root: fastapi\app\services\pdf_reader\__init__.py
+from app.services._lazy import lazy_service
 
-TASKS = getattr(Service, "tasks", [])
+__all__ = ["Service", "TASKS", "get_tasks"]
+__getattr__ = lazy_service(__name__)
 
-def get_tasks() -> list[str]:
-    return TASKS
 
-__all__ = ["Service", "TASKS", "get_tasks"]
+def get_tasks() -> list[str]:
+    return __getattr__("TASKS")
@@ -1,8 +1,12 @@
 # Path from repo root: fastapi\app\services\pdf_reader\service.py
 from __future__ import annotations
 
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from app.services.base import BaseService
 
@@ -17,6 +21,65 @@ except Exception:
     PdfReader = None
 
 
+# Documents with at least this many pages are split across worker processes.
+# Neither PyMuPDF nor PyPDF2 lets threads run pages in parallel (fitz documents
+# are not thread-safe, PyPDF2 is pure Python), so each worker opens the file
+# itself and extracts one contiguous page range.
+PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "64"))
+PARALLEL_WORKERS = int(os.getenv("PDF_PARALLEL_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# One shared pool, created on first use and capped at PARALLEL_WORKERS no matter
+# how many requests run at once. "spawn" workers: extract_text runs in the
+# server's threadpool, and forking a multi-threaded process can deadlock.
+_POOL: ProcessPoolExecutor | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def _extract_range(path: str, start: int, stop: int) -> str:
+    """Text of pages [start, stop), joined like the sequential path (worker entry point)."""
+    if fitz:
+        with fitz.open(path) as doc:
+            return "\n".join(doc.load_page(i).get_text() for i in range(start, stop))
+    pages = PdfReader(path).pages
+    return "\n".join(pages[i].extract_text() or "" for i in range(start, stop))
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = ProcessPoolExecutor(
+                    max_workers=PARALLEL_WORKERS, mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _POOL
+
+
+def shutdown_pool() -> None:
+    """Stop the extraction worker processes (called from the app lifespan)."""
+    global _POOL
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _extract_parallel(path: str, page_count: int) -> str:
+    workers = min(PARALLEL_WORKERS, page_count)
+    step = -(-page_count // workers)  # ceil: one range per worker
+    starts = range(0, page_count, step)
+    # map keeps range order, so pages come back in document order
+    parts = _pool().map(
+        _extract_range,
+        [path] * len(starts), starts, [min(s + step, page_count) for s in starts],
+    )
+    return "\n".join(parts)
+
+
+def _wants_parallel(page_count: int) -> bool:
+    return PARALLEL_WORKERS > 1 and page_count >= PARALLEL_MIN_PAGES
+
+
 class Service(BaseService):
     name = "pdf_reader"
     tasks = ["extract_text"]
@@ -48,14 +111,20 @@ class Service(BaseService):
         if fitz is None and PdfReader is None:
             return {"ok": False, "error": "Neither PyMuPDF nor PyPDF2 is installed."}
 
-        text = ""
+        text: Optional[str] = None
         try:
             if fitz:
-                doc = fitz.open(file_path)
-                text = "\n".join(page.get_text() for page in doc)
-            elif PdfReader:
+                with fitz.open(file_path) as doc:
+                    page_count = doc.page_count
+                    if not _wants_parallel(page_count):
+                        text = "\n".join(page.get_text() for page in doc)
+            else:
                 reader = PdfReader(str(file_path))
-                text = "\n".join(page.extract_text() or "" for page in reader.pages)
+                page_count = len(reader.pages)
+                if not _wants_parallel(page_count):
+                    text = "\n".join(page.extract_text() or "" for page in reader.pages)
+            if text is None:
+                text = _extract_parallel(str(file_path), page_count)
         except Exception as e:
             return {"ok": False, "error": str(e)}
 
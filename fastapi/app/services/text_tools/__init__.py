@@ -1,9 +1,9 @@
 # Path from repo root: fastapi\app\services\text_tools\__init__.py
-from .service import Service
+from app.services._lazy import lazy_service
 
-TASKS = getattr(Service, "tasks", [])
+__all__ = ["Service", "TASKS", "get_tasks"]
+__getattr__ = lazy_service(__name__)
 
-def get_tasks() -> list[str]:
-    return TASKS
 
-__all__ = ["Service", "TASKS", "get_tasks"]
+def get_tasks() -> list[str]:
+    return __getattr__("TASKS")
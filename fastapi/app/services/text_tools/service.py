@@ -1,5 +1,9 @@
 # Path from repo root: fastapi\app\services\text_tools\service.py
 from __future__ import annotations
+import os
+import re
+import shutil
+import uuid
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any
@@ -12,6 +16,9 @@ UPLOADS_ROOTS: tuple[Path, ...] = (
     Path("data") / "uploads",
 )
 
+# characters not allowed in file names -> "_", mapped in C by str.translate
+_FILENAME_TRANS = str.maketrans('<>:"/\\|?*', "_" * 9)
+
 @dataclass
 class SaveOpts:
     rel_path: str | None = None
@@ -36,8 +43,7 @@ class Service(BaseService):
 
     @staticmethod
     def _sanitize_filename(name: str) -> str:
-        bad = '<>:"/\\|?*'
-        return "".join("_" if c in bad else c for c in name).strip()
+        return name.translate(_FILENAME_TRANS).strip()
 
     @staticmethod
     def _normalize_text(txt: str, opts: dict | None) -> str:
@@ -53,13 +59,32 @@ class Service(BaseService):
     def _ensure_unique_path(p: Path) -> Path:
         if not p.exists():
             return p
+        # one directory listing instead of a stat() per taken "(i)" name: next is max + 1
         stem, suf = p.stem, p.suffix
-        i = 1
-        while True:
-            cand = p.with_name(f"{stem}({i}){suf}")
-            if not cand.exists():
-                return cand
-            i += 1
+        taken = re.compile(re.escape(stem) + r"\((\d+)\)" + re.escape(suf))
+        last = 0
+        with os.scandir(p.parent) as it:
+            for entry in it:
+                m = taken.fullmatch(entry.name)
+                if m:
+                    last = max(last, int(m.group(1)))
+        return p.with_name(f"{stem}({last + 1}){suf}")
+
+    @staticmethod
+    def _break_hard_link(p: Path, keep_content: bool) -> None:
+        # uploads are hard links into the content store (router_uploads._place_by_digest):
+        # writing through a shared inode would change every copy, so give `p` its own file
+        try:
+            if p.stat().st_nlink <= 1:
+                return
+        except FileNotFoundError:
+            return
+        if not keep_content:
+            p.unlink()
+            return
+        tmp = p.with_name(f".{p.name}.{uuid.uuid4().hex}.tmp")
+        shutil.copyfile(p, tmp)
+        os.replace(tmp, p)
 
     def save_text(self, payload: dict[str, Any]) -> dict[str, Any]:
         if not isinstance(payload, dict):
@@ -94,16 +119,26 @@ class Service(BaseService):
 
         text = self._normalize_text(text, opts.normalize)
         if opts.newline in {"\n", "\r\n"}:
-            text = text.replace("\r\n", "\n").replace("\r", "\n")
+            if "\r" in text:  # memchr; plain "\n" text skips both normalization passes
+                text = text.replace("\r\n", "\n").replace("\r", "\n")
             if opts.newline == "\r\n":
                 text = text.replace("\n", "\r\n")
 
-        mode = "ab" if opts.append else "wb"
-        data = text.encode(opts.encoding, errors="replace")
-        if (not opts.append) and opts.bom and opts.encoding.lower().replace("-", "") == "utf8":
-            data = b"\xef\xbb\xbf" + data
+        encoding = opts.encoding
+        if (not opts.append) and opts.bom and encoding.lower().replace("-", "") == "utf8":
+            encoding = "utf-8-sig"  # the codec writes the BOM: no bom + data copy
+        data = text.encode(encoding, errors="replace")
+
+        self._break_hard_link(out_path, keep_content=opts.append)
 
-        with open(out_path, mode) as f:
-            f.write(data)
+        # one unbuffered write straight to the fd (no io.BufferedWriter in between)
+        flags = os.O_WRONLY | os.O_CREAT | (os.O_APPEND if opts.append else os.O_TRUNC)
+        fd = os.open(out_path, flags | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
 
         return {"ok": True, "saved_to": str(out_path), "bytes_written": len(data)}
\ No newline at end of file
@@ -1,25 +1,27 @@
 # Path from repo root: fastapi\app\services\uploader_audio\service.py
 from __future__ import annotations
+import binascii
 from pathlib import Path
 from typing import Any, Optional
 from app.services.base import BaseService
 from app.services._utils_upload import (
-    UPLOADS_ROOT, b64_to_bytes, sha256_hex, ym_subdir, ensure_ext
+    UPLOADS_ROOT, PayloadTooLarge, b64_peek, b64_size, ensure_dir, ensure_ext, save_b64
 )
 
 TASKS = ["upload_audio"]
 def get_tasks() -> list[str]: return TASKS
 
-def is_wav(b: bytes) -> bool:
-    return len(b) >= 12 and b[:4] == b"RIFF" and b[8:12] == b"WAVE"
+def sniff(data: bytes) -> Optional[str]:
+    """Audio extension from the leading magic bytes, or None. Offset startswith: no slices."""
+    if data.startswith(b"RIFF") and data.startswith(b"WAVE", 8):
+        return ".wav"
+    if data.startswith(b"OggS"):
+        return ".ogg"
+    if data.startswith(b"ID3") or (len(data) >= 2 and data[0] == 0xFF and (data[1] & 0xE0) == 0xE0):
+        return ".mp3"
+    return None
 
-def is_mp3(b: bytes) -> bool:
-    return b[:3] == b"ID3" or (len(b) >= 2 and b[0] == 0xFF and (b[1] & 0xE0) == 0xE0)
-
-def is_ogg(b: bytes) -> bool:
-    return b[:4] == b"OggS"
-
-ALLOWED_EXTS = {".wav": is_wav, ".mp3": is_mp3, ".ogg": is_ogg}
+ALLOWED_EXTS = frozenset((".wav", ".mp3", ".ogg"))
 
 class Service(BaseService):
     name = "uploader_audio"
@@ -30,7 +32,7 @@ class Service(BaseService):
 
     def __init__(self) -> None:
         self.Root = self.ROOT
-        self.Root.mkdir(parents=True, exist_ok=True)
+        ensure_dir(self.Root)
 
     def upload_audio(self, payload: dict[str, Any]) -> dict[str, Any]:
         b64 = (payload or {}).get("content_b64")
@@ -45,26 +47,28 @@ class Service(BaseService):
         if ext not in ALLOWED_EXTS:
             return {"ok": False, "error": f"extension not allowed: {ext}"}
 
+        b64 = str(b64)
+        size = b64_size(b64)
+        if size is not None and size > self.MAX_BYTES:
+            return {"ok": False, "error": f"Audio too large (> {self.MAX_BYTES} bytes)"}
         try:
-            data = b64_to_bytes(str(b64))
+            head = b64_peek(b64, 12)
         except Exception as exc:
             return {"ok": False, "error": f"invalid base64: {exc}"}
-
-        size = len(data)
-        if size == 0:
+        if not head:
             return {"ok": False, "error": "empty file"}
-        if size > self.MAX_BYTES:
-            return {"ok": False, "error": f"Audio too large (> {self.MAX_BYTES} bytes)"}
 
         # Magic check
-        if not ALLOWED_EXTS[ext](data):
+        if sniff(head) != ext:
             return {"ok": False, "error": f"invalid audio content for {ext}"}
 
-        subdir = ym_subdir(self.Root)
-        sha = sha256_hex(data)
-        path = subdir / f"{sha[:16]}{ext}"
-        if not path.exists():
-            path.write_bytes(data)
+        # decode -> sha256 -> disk in one streaming pass
+        try:
+            path, size, sha = save_b64(b64, self.Root, ext, self.MAX_BYTES)
+        except PayloadTooLarge:
+            return {"ok": False, "error": f"Audio too large (> {self.MAX_BYTES} bytes)"}
+        except (ValueError, binascii.Error) as exc:  # disk errors (OSError) propagate
+            return {"ok": False, "error": f"invalid base64: {exc}"}
 
         rel_path = str(path.relative_to(UPLOADS_ROOT)).replace("\\", "/")
         mime = "audio/" + ext.lstrip(".")
@@ -1,12 +1,15 @@
 # Path from repo root: fastapi\app\services\uploader_docs\service.py
 from __future__ import annotations
-from typing import Any, Optional
+import binascii
+import struct
+from typing import Any, Optional, Union
 from pathlib import Path
 from zipfile import ZipFile, BadZipFile
 
 from app.services.base import BaseService
 from app.services._utils_upload import (
-    UPLOADS_ROOT, b64_to_bytes, sha256_hex, ym_subdir, ensure_ext
+    UPLOADS_ROOT, PayloadTooLarge, b64_peek, b64_size, ensure_dir, ensure_ext, place_by_digest,
+    stage_b64,
 )
 
 """
@@ -25,6 +28,46 @@ Max size: 50 MB
 Saved under: uploads/docs/YYYY/MM/<sha16>.<ext>
 """
 
+# ZIP Local File Header: signature, version, flags, method, time, date, crc32,
+# compressed size, uncompressed size, name length, extra length; name at +30
+_LFH = struct.Struct("<4sHHHHHIIIHH")
+_LFH_SIG = b"PK\x03\x04"
+_OLE_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"  # OLE Compound File (D0 CF 11 E0 A1 B1 1A E1)
+
+# OOXML: the part that identifies the package type
+_OOXML_MEMBER = {
+    ".docx": b"word/document.xml",
+    ".xlsx": b"xl/workbook.xml",
+    ".pptx": b"ppt/presentation.xml",
+}
+# ODF: content of the leading 'mimetype' member
+_ODF_MIMETYPE = {
+    ".odt": b"application/vnd.oasis.opendocument.text",
+    ".ods": b"application/vnd.oasis.opendocument.spreadsheet",
+    ".odp": b"application/vnd.oasis.opendocument.presentation",
+}
+
+
+def _zip_first_member(head: bytes) -> Optional[tuple[bytes, int, bytes]]:
+    """(name, compression method, stored data) of the entry at offset 0, from its Local File Header."""
+    if len(head) < _LFH.size or not head.startswith(_LFH_SIG):
+        return None
+    _, _, _, method, _, _, _, csize, _, nlen, xlen = _LFH.unpack_from(head)
+    name_end = _LFH.size + nlen
+    return head[_LFH.size:name_end], method, head[name_end + xlen:name_end + xlen + csize]
+
+
+def _zip_head_has_member(head: bytes, member: bytes) -> bool:
+    """True if `head` holds a Local File Header for `member` (bytes.find, no ZipFile)."""
+    i = head.find(member)
+    while i != -1:
+        lfh = i - _LFH.size
+        if lfh >= 0 and head.startswith(_LFH_SIG, lfh) and _LFH.unpack_from(head, lfh)[9] == len(member):
+            return True
+        i = head.find(member, i + 1)
+    return False
+
+
 TASKS = ["upload_doc"]
 def get_tasks() -> list[str]:
     return TASKS
@@ -51,31 +94,32 @@ class Service(BaseService):
     ALLOWED_EXTS = set(MIME_MAP.keys())
 
     def __init__(self) -> None:
-        self.ROOT.mkdir(parents=True, exist_ok=True)
+        ensure_dir(self.ROOT)
 
     # ---------- magic check helpers ----------
 
     @staticmethod
     def _is_rtf(data: bytes) -> bool:
         # RTF usually starts with "{\rtf"
-        return data[:5] == b"{\\rtf"
+        return data.startswith(b"{\\rtf")
 
     @staticmethod
     def _is_ole_doc(data: bytes) -> bool:
         # Legacy .doc uses OLE Compound File header
-        return len(data) >= 8 and data[:8] == bytes.fromhex("D0CF11E0A1B11AE1")
+        return data.startswith(_OLE_MAGIC)
 
     @staticmethod
-    def _zip_has_member(data: bytes, member: str) -> bool:
-        try:
-            with ZipFile(Path("|mem|"), "r") as _:
-                pass  # placeholder (ZipFile doesn't accept raw bytes directly)
-        except Exception:
-            pass
-        # open from bytes safely
+    def _zip_source(src: Union[Path, bytes]):
+        # the staged file on disk (ZipFile seeks to the central directory), or raw bytes
+        if isinstance(src, Path):
+            return src
+        from io import BytesIO
+        return BytesIO(src)
+
+    @classmethod
+    def _zip_has_member(cls, src: Union[Path, bytes], member: str) -> bool:
         try:
-            from io import BytesIO
-            with ZipFile(BytesIO(data)) as zf:
+            with ZipFile(cls._zip_source(src)) as zf:
                 try:
                     zf.getinfo(member)
                     return True
@@ -86,20 +130,19 @@ class Service(BaseService):
         except Exception:
             return False
 
-    def _is_docx(self, data: bytes) -> bool:
+    def _is_docx(self, data: Union[Path, bytes]) -> bool:
         return self._zip_has_member(data, "word/document.xml")
 
-    def _is_xlsx(self, data: bytes) -> bool:
+    def _is_xlsx(self, data: Union[Path, bytes]) -> bool:
         return self._zip_has_member(data, "xl/workbook.xml")
 
-    def _is_pptx(self, data: bytes) -> bool:
+    def _is_pptx(self, data: Union[Path, bytes]) -> bool:
         return self._zip_has_member(data, "ppt/presentation.xml")
 
-    def _odf_mimetype_is(self, data: bytes, expected: str) -> bool:
+    def _odf_mimetype_is(self, data: Union[Path, bytes], expected: str) -> bool:
         # ODF packages store a 'mimetype' file at root (stored, not compressed)
         try:
-            from io import BytesIO
-            with ZipFile(BytesIO(data)) as zf:
+            with ZipFile(self._zip_source(data)) as zf:
                 try:
                     with zf.open("mimetype", "r") as f:
                         mt = f.read(200).decode("utf-8", errors="ignore").strip()
@@ -111,15 +154,43 @@ class Service(BaseService):
         except Exception:
             return False
 
-    def _is_odt(self, data: bytes) -> bool:
+    def _is_odt(self, data: Union[Path, bytes]) -> bool:
         return self._odf_mimetype_is(data, "application/vnd.oasis.opendocument.text")
 
-    def _is_ods(self, data: bytes) -> bool:
+    def _is_ods(self, data: Union[Path, bytes]) -> bool:
         return self._odf_mimetype_is(data, "application/vnd.oasis.opendocument.spreadsheet")
 
-    def _is_odp(self, data: bytes) -> bool:
+    def _is_odp(self, data: Union[Path, bytes]) -> bool:
         return self._odf_mimetype_is(data, "application/vnd.oasis.opendocument.presentation")
 
+    ZIP_EXTS = frozenset((".docx", ".xlsx", ".pptx", ".odt", ".ods", ".odp"))
+    HEAD_BYTES = 64 * 1024  # OOXML parts / the ODF mimetype entry sit near the start
+
+    @staticmethod
+    def _zip_head_ok(ext: str, head: bytes) -> bool:
+        """
+        Package check from the Local File Headers in the head alone (no ZipFile,
+        no central directory). False means "not found up front", not "invalid":
+        the caller then falls back to the ZipFile checks.
+        """
+        if ext in _ODF_MIMETYPE:
+            # ODF spec: 'mimetype' is the first entry, stored uncompressed
+            first = _zip_first_member(head)
+            return first is not None and first[0] == b"mimetype" and first[1] == 0 \
+                and first[2].strip() == _ODF_MIMETYPE[ext]
+        member = _OOXML_MEMBER.get(ext)
+        return member is not None and _zip_head_has_member(head, member)
+
+    def _head_ok(self, ext: str, head: bytes) -> bool:
+        """Checks that need only the first bytes; run before decoding the whole payload."""
+        if ext in self.ZIP_EXTS:
+            return head.startswith(b"PK\x03\x04")  # local file header; members checked after decode
+        if ext == ".rtf":
+            return self._is_rtf(head)
+        if ext == ".doc":
+            return self._is_ole_doc(head)
+        return False
+
     # ---------- main task ----------
 
     def upload_doc(self, payload: dict[str, Any]) -> dict[str, Any]:
@@ -141,37 +212,45 @@ class Service(BaseService):
         if ext not in self.ALLOWED_EXTS:
             return {"ok": False, "error": f"extension not allowed: {ext}"}
 
+        # size and leading magic are settled before the full decode
+        b64 = str(b64)
+        size = b64_size(b64)  # None: line-wrapped base64, known only after decoding
+        if size is not None and size > self.MAX_BYTES:
+            return {"ok": False, "error": f"file too large (> {self.MAX_BYTES} bytes)"}
         try:
-            data = b64_to_bytes(str(b64))
+            head = b64_peek(b64, self.HEAD_BYTES)
         except Exception as exc:
             return {"ok": False, "error": f"invalid base64: {exc}"}
-
-        size = len(data)
-        if size == 0:
+        if not head:
             return {"ok": False, "error": "empty file"}
-        if size > self.MAX_BYTES:
+        if not self._head_ok(ext, head):
+            return {"ok": False, "error": f"invalid or corrupted {ext} content"}
+
+        # decode -> sha256 -> staging file in one streaming pass
+        try:
+            subdir, tmp, size, sha = stage_b64(b64, self.ROOT, self.MAX_BYTES)
+        except PayloadTooLarge:
             return {"ok": False, "error": f"file too large (> {self.MAX_BYTES} bytes)"}
+        except (ValueError, binascii.Error) as exc:  # disk errors (OSError) propagate
+            return {"ok": False, "error": f"invalid base64: {exc}"}
 
-        # Magic checks per extension
-        ok = False
-        if ext == ".docx": ok = self._is_docx(data)
-        elif ext == ".xlsx": ok = self._is_xlsx(data)
-        elif ext == ".pptx": ok = self._is_pptx(data)
-        elif ext == ".odt": ok = self._is_odt(data)
-        elif ext == ".ods": ok = self._is_ods(data)
-        elif ext == ".odp": ok = self._is_odp(data)
-        elif ext == ".rtf": ok = self._is_rtf(data)
-        elif ext == ".doc": ok = self._is_ole_doc(data)
+        # ZIP-based formats: decided from the head when the LFH is there; otherwise
+        # the member / mimetype checks read the staged package's central directory
+        ok = ext not in self.ZIP_EXTS or self._zip_head_ok(ext, head)
+        if not ok:
+            if ext == ".docx": ok = self._is_docx(tmp)
+            elif ext == ".xlsx": ok = self._is_xlsx(tmp)
+            elif ext == ".pptx": ok = self._is_pptx(tmp)
+            elif ext == ".odt": ok = self._is_odt(tmp)
+            elif ext == ".ods": ok = self._is_ods(tmp)
+            elif ext == ".odp": ok = self._is_odp(tmp)
 
         if not ok:
+            tmp.unlink(missing_ok=True)
             return {"ok": False, "error": f"invalid or corrupted {ext} content"}
 
         # Save
-        subdir = ym_subdir(self.ROOT)
-        sha = sha256_hex(data)
-        path = subdir / f"{sha[:16]}{ext}"
-        if not path.exists():
-            path.write_bytes(data)
+        path = place_by_digest(tmp, subdir, sha, ext)
 
         rel_path = str(path.relative_to(UPLOADS_ROOT)).replace("\\", "/")
         mime = self.MIME_MAP[ext]
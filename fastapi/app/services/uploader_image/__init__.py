@@ -1,5 +1,9 @@
-# Path from repo root: fastapi\app\services\uploader_docs\__init__.py
-from .service import Service
-TASKS = getattr(Service, "tasks", [])
+# Path from repo root: fastapi\app\services\uploader_image\__init__.py
+from app.services._lazy import lazy_service
+
+__all__ = ["Service", "TASKS", "get_tasks"]
+__getattr__ = lazy_service(__name__)
+
+
 def get_tasks() -> list[str]:
-    return TASKS
+    return __getattr__("TASKS")
@@ -1,11 +1,13 @@
 # Path from repo root: fastapi\app\services\uploader_image\service.py
 from __future__ import annotations
+import binascii
+import re
 from typing import Any, Optional
 from pathlib import Path
 
 from app.services.base import BaseService
 from app.services._utils_upload import (
-    UPLOADS_ROOT, b64_to_bytes, sha256_hex, ym_subdir, ensure_ext
+    UPLOADS_ROOT, PayloadTooLarge, b64_peek, b64_size, ensure_dir, ensure_ext, save_b64
 )
 
 """
@@ -21,6 +23,11 @@ Max size: 25 MB
 Path: uploads/images/YYYY/MM/<sha16>.<ext>
 """
 
+_PNG_MAGIC = b"\x89PNG\r\n\x1a\n"  # 89 50 4E 47 0D 0A 1A 0A
+
+# HEIF brands in one regex pass; search(b, 0, n) bounds the window without a slice copy
+_HEIC_BRAND_RE = re.compile(b"heic|heif|hevc|mif1")
+
 TASKS = ["upload_image"]
 def get_tasks() -> list[str]:
     return TASKS
@@ -44,35 +51,34 @@ class Service(BaseService):
     ALLOWED_EXTS = set(MIME_MAP.keys())
 
     def __init__(self) -> None:
-        self.ROOT.mkdir(parents=True, exist_ok=True)
+        ensure_dir(self.ROOT)
 
     # ---------- magic helpers ----------
 
     @staticmethod
     def _is_jpeg(b: bytes) -> bool:
-        return len(b) >= 3 and b[:3] == b"\xFF\xD8\xFF"
+        return b.startswith(b"\xFF\xD8\xFF")
 
     @staticmethod
     def _is_png(b: bytes) -> bool:
-        return b[:8] == bytes.fromhex("89504E470D0A1A0A")
+        return b.startswith(_PNG_MAGIC)
 
     @staticmethod
     def _is_gif(b: bytes) -> bool:
-        return b[:6] in (b"GIF87a", b"GIF89a")
+        return b.startswith((b"GIF87a", b"GIF89a"))
 
     @staticmethod
     def _is_webp(b: bytes) -> bool:
-        return len(b) >= 12 and b[:4] == b"RIFF" and b[8:12] == b"WEBP"
+        return b.startswith(b"RIFF") and b.startswith(b"WEBP", 8)
 
     @staticmethod
     def _has_ftyp(b: bytes) -> bool:
-        return b"ftyp" in b[:128]
+        return b.find(b"ftyp", 0, 128) != -1
 
     @staticmethod
     def _heic_brand_ok(b: bytes) -> bool:
-        head = b[:256]
         # أشهر العلامات: 'heic', 'heif', 'hevc', 'mif1'
-        return any(tag in head for tag in (b"heic", b"heif", b"hevc", b"mif1"))
+        return _HEIC_BRAND_RE.search(b, 0, 256) is not None
 
     # ---------- main task ----------
 
@@ -95,16 +101,16 @@ class Service(BaseService):
         if ext not in self.ALLOWED_EXTS:
             return {"ok": False, "error": f"extension not allowed: {ext}"}
 
+        b64 = str(b64)
+        size = b64_size(b64)
+        if size is not None and size > self.MAX_BYTES:
+            return {"ok": False, "error": f"Image too large (> {self.MAX_BYTES} bytes)"}
         try:
-            data = b64_to_bytes(str(b64))
+            data = b64_peek(b64, 256)  # every magic check below reads at most 256 bytes
         except Exception as exc:
             return {"ok": False, "error": f"invalid base64: {exc}"}
-
-        size = len(data)
-        if size == 0:
+        if not data:
             return {"ok": False, "error": "empty file"}
-        if size > self.MAX_BYTES:
-            return {"ok": False, "error": f"Image too large (> {self.MAX_BYTES} bytes)"}
 
         # Magic checks per extension
         ok = False
@@ -117,11 +123,13 @@ class Service(BaseService):
         if not ok:
             return {"ok": False, "error": f"invalid or unsupported {ext} content"}
 
-        subdir = ym_subdir(self.ROOT)
-        sha = sha256_hex(data)
-        path = subdir / f"{sha[:16]}{ext}"
-        if not path.exists():
-            path.write_bytes(data)
+        # decode -> sha256 -> disk in one streaming pass
+        try:
+            path, size, sha = save_b64(b64, self.ROOT, ext, self.MAX_BYTES)
+        except PayloadTooLarge:
+            return {"ok": False, "error": f"Image too large (> {self.MAX_BYTES} bytes)"}
+        except (ValueError, binascii.Error) as exc:  # disk errors (OSError) propagate
+            return {"ok": False, "error": f"invalid base64: {exc}"}
 
         rel_path = str(path.relative_to(UPLOADS_ROOT)).replace("\\", "/")
         mime = self.MIME_MAP[ext]
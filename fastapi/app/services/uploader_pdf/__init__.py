@@ -1,4 +1,9 @@
-# Path from repo root: fastapi\app\services\payload_maker\__init__.py
-from .service import Service
-TASKS = getattr(Service, "tasks", [])
-def get_tasks() -> list[str]: return TASKS
+# Path from repo root: fastapi\app\services\uploader_pdf\__init__.py
+from app.services._lazy import lazy_service
+
+__all__ = ["Service", "TASKS", "get_tasks"]
+__getattr__ = lazy_service(__name__)
+
+
+def get_tasks() -> list[str]:
+    return __getattr__("TASKS")
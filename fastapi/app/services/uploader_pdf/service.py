@@ -1,10 +1,11 @@
 # Path from repo root: fastapi\app\services\uploader_pdf\service.py
 from __future__ import annotations
+import binascii
 from pathlib import Path
 from typing import Any
 from app.services.base import BaseService
 from app.services._utils_upload import (
-    UPLOADS_ROOT, b64_to_bytes, sha256_hex, ym_subdir
+    UPLOADS_ROOT, PayloadTooLarge, b64_peek, b64_size, ensure_dir, save_b64
 )
 
 TASKS = ["upload_pdf"]
@@ -19,32 +20,34 @@ class Service(BaseService):
 
     def __init__(self) -> None:
         self.Root = self.ROOT
-        self.Root.mkdir(parents=True, exist_ok=True)
+        ensure_dir(self.Root)
 
     def upload_pdf(self, payload: dict[str, Any]) -> dict[str, Any]:
         b64 = (payload or {}).get("content_b64")
         if not b64:
             return {"ok": False, "error": "content_b64 is required"}
+        b64 = str(b64)
+        size = b64_size(b64)
+        if size is not None and size > self.MAX_BYTES:
+            return {"ok": False, "error": f"PDF too large (> {self.MAX_BYTES} bytes)"}
         try:
-            data = b64_to_bytes(str(b64))
+            head = b64_peek(b64, 4)
         except Exception as exc:
             return {"ok": False, "error": f"invalid base64: {exc}"}
-
-        size = len(data)
-        if size == 0:
+        if not head:
             return {"ok": False, "error": "empty file"}
-        if size > self.MAX_BYTES:
-            return {"ok": False, "error": f"PDF too large (> {self.MAX_BYTES} bytes)"}
 
         # Magic bytes: %PDF
-        if not (size >= 4 and data[:4] == b"%PDF"):
+        if not head.startswith(b"%PDF"):
             return {"ok": False, "error": "not a valid PDF (missing %PDF header)"}
 
-        subdir = ym_subdir(self.Root)
-        sha = sha256_hex(data)
-        path = subdir / f"{sha[:16]}.pdf"
-        if not path.exists():
-            path.write_bytes(data)
+        # decode -> sha256 -> disk in one streaming pass
+        try:
+            path, size, sha = save_b64(b64, self.Root, ".pdf", self.MAX_BYTES)
+        except PayloadTooLarge:
+            return {"ok": False, "error": f"PDF too large (> {self.MAX_BYTES} bytes)"}
+        except (ValueError, binascii.Error) as exc:  # disk errors (OSError) propagate
+            return {"ok": False, "error": f"invalid base64: {exc}"}
 
         rel_path = str(path.relative_to(UPLOADS_ROOT)).replace("\\", "/")
         return {"ok": True, "rel_path": rel_path, "size": size, "sha256": sha, "mime": "application/pdf"}
\ No newline at end of file
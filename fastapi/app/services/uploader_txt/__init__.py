@@ -1,7 +1,9 @@
 # Path from repo root: fastapi\app\services\uploader_txt\__init__.py
-from .service import Service
+from app.services._lazy import lazy_service
+
+__all__ = ["Service", "TASKS", "get_tasks"]
+__getattr__ = lazy_service(__name__)
 
-TASKS = getattr(Service, "tasks", [])
 
 def get_tasks() -> list[str]:
-    return TASKS
+    return __getattr__("TASKS")
@@ -1,10 +1,11 @@
 # Path from repo root: fastapi\app\services\uploader_txt\service.py
 from __future__ import annotations
+import binascii
 from pathlib import Path
 from typing import Any
 from app.services.base import BaseService
 from app.services._utils_upload import (
-    UPLOADS_ROOT, b64_to_bytes, sha256_hex, ym_subdir, ensure_ext
+    UPLOADS_ROOT, PayloadTooLarge, b64_peek, b64_size, ensure_dir, ensure_ext, save_b64
 )
 
 TASKS = ["upload_txt"]
@@ -21,7 +22,7 @@ class Service(BaseService):
     MAX_BYTES = 5 * 1024 * 1024  # 5 MB
 
     def __init__(self) -> None:
-        self.ROOT.mkdir(parents=True, exist_ok=True)
+        ensure_dir(self.ROOT)
 
     def upload_txt(self, payload: dict[str, Any]) -> dict[str, Any]:
         """
@@ -41,26 +42,28 @@ class Service(BaseService):
         if ext != ".txt":
             return {"ok": False, "error": f"only .txt allowed, not {ext}"}
 
+        b64 = str(b64)
+        size = b64_size(b64)
+        if size is not None and size > self.MAX_BYTES:
+            return {"ok": False, "error": f"TXT too large (> {self.MAX_BYTES} bytes)"}
         try:
-            data = b64_to_bytes(str(b64))
+            head = b64_peek(b64, 1024)
         except Exception as exc:
             return {"ok": False, "error": f"invalid base64: {exc}"}
-
-        size = len(data)
-        if size == 0:
+        if not head:
             return {"ok": False, "error": "empty file"}
-        if size > self.MAX_BYTES:
-            return {"ok": False, "error": f"TXT too large (> {self.MAX_BYTES} bytes)"}
 
         # محاولة بسيطة للتأكد أن المحتوى نص (كل bytes < 128)
-        if not all(b < 128 for b in data[:1024]):  # نختبر أول 1KB فقط
+        if not head[:1024].isascii():  # أول 1KB فقط؛ فحص واحد في C (كلمة كلمة) بدل حلقة بايثون
             return {"ok": False, "error": "file does not look like plain text"}
 
-        subdir = ym_subdir(self.ROOT)
-        sha = sha256_hex(data)
-        path = subdir / f"{sha[:16]}{ext}"
-        if not path.exists():
-            path.write_bytes(data)
+        # decode -> sha256 -> disk في مرور واحد
+        try:
+            path, size, sha = save_b64(b64, self.ROOT, ext, self.MAX_BYTES)
+        except PayloadTooLarge:
+            return {"ok": False, "error": f"TXT too large (> {self.MAX_BYTES} bytes)"}
+        except (ValueError, binascii.Error) as exc:  # disk errors (OSError) propagate
+            return {"ok": False, "error": f"invalid base64: {exc}"}
 
         rel_path = str(path.relative_to(UPLOADS_ROOT)).replace("\\", "/")
         return {
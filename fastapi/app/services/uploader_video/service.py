@@ -1,11 +1,13 @@
 # Path from repo root: fastapi\app\services\uploader_video\service.py
 from __future__ import annotations
+import binascii
+import re
 from typing import Any, Optional
 from pathlib import Path
 
 from app.services.base import BaseService
 from app.services._utils_upload import (
-    UPLOADS_ROOT, b64_to_bytes, sha256_hex, ym_subdir, ensure_ext
+    UPLOADS_ROOT, PayloadTooLarge, b64_peek, b64_size, ensure_dir, ensure_ext, save_b64
 )
 
 """
@@ -20,6 +22,13 @@ Max size: 1 GB
 Path: uploads/video/YYYY/MM/<sha16>.<ext>
 """
 
+_EBML_MAGIC = b"\x1aE\xdf\xa3"  # 1A 45 DF A3
+
+# brand scans: one regex pass over the window instead of one `in` per brand;
+# search(data, 0, n) bounds the window without slicing a copy
+_MP4_BRAND_RE = re.compile(b"isom|mp41|mp42|avc1")
+_MOV_BRAND_RE = re.compile(b"ftypqt|qt  ")
+
 TASKS = ["upload_video"]
 def get_tasks() -> list[str]:
     return TASKS
@@ -43,47 +52,60 @@ class Service(BaseService):
     ALLOWED_EXTS = set(MIME_MAP.keys())
 
     def __init__(self) -> None:
-        self.ROOT.mkdir(parents=True, exist_ok=True)
+        ensure_dir(self.ROOT)
 
     # ---------- magic helpers ----------
 
     @staticmethod
     def _has_ftyp(data: bytes) -> bool:
         # ISO BMFF files contain 'ftyp' box near start (within first ~32-64 bytes)
-        search_window = data[:128]
-        return b"ftyp" in search_window
+        return data.find(b"ftyp", 0, 128) != -1
 
     @staticmethod
     def _mp4_brand_ok(data: bytes) -> bool:
         # MP4 common brands: isom, mp41, mp42, avc1 (best-effort)
-        head = data[:128]
-        return any(b in head for b in (b"isom", b"mp41", b"mp42", b"avc1"))
+        return _MP4_BRAND_RE.search(data, 0, 128) is not None
 
     @staticmethod
     def _mov_brand_ok(data: bytes) -> bool:
         # QuickTime brand often 'qt  ' or 'ftypqt  '
-        head = data[:128]
-        return b"ftypqt" in head or b"qt  " in head
+        return _MOV_BRAND_RE.search(data, 0, 128) is not None
 
     @staticmethod
     def _is_ebml(data: bytes) -> bool:
         # EBML header: 1A 45 DF A3
-        return len(data) >= 4 and data[:4] == bytes.fromhex("1A45DFA3")
+        return data.startswith(_EBML_MAGIC)
 
     @staticmethod
     def _ebml_doctype(data: bytes) -> Optional[str]:
         # Lightweight docType sniff: search small window for 'webm' or 'matroska'
-        head = data[:4096]
-        if b"webm" in head:
+        if data.find(b"webm", 0, 4096) != -1:
             return "webm"
-        if b"matroska" in head:
+        if data.find(b"matroska", 0, 4096) != -1:
             return "matroska"
         return None
 
     @staticmethod
     def _is_avi(data: bytes) -> bool:
         # RIFF....AVI
-        return len(data) >= 12 and data[:4] == b"RIFF" and data[8:12] == b"AVI "
+        return data.startswith(b"RIFF") and data.startswith(b"AVI ", 8)
+
+    # every magic check above looks at the first 4096 bytes at most
+    HEAD_BYTES = 4096
+
+    def _magic_ok(self, ext: str, head: bytes) -> bool:
+        if ext in (".mp4", ".mov"):
+            return self._has_ftyp(head) and (
+                self._mp4_brand_ok(head) if ext == ".mp4" else self._mov_brand_ok(head)
+            )
+        if ext in (".mkv", ".webm"):
+            if not self._is_ebml(head):
+                return False
+            dt = self._ebml_doctype(head)
+            return (ext == ".mkv" and dt == "matroska") or (ext == ".webm" and dt == "webm")
+        if ext == ".avi":
+            return self._is_avi(head)
+        return False
 
     # ---------- main task ----------
 
@@ -106,38 +128,28 @@ class Service(BaseService):
         if ext not in self.ALLOWED_EXTS:
             return {"ok": False, "error": f"extension not allowed: {ext}"}
 
+        # size and magic are settled before the full decode: an oversize or
+        # mislabelled upload costs a length check and a 4 KB decode, not gigabytes
+        b64 = str(b64)
+        size = b64_size(b64)  # None: line-wrapped base64, known only after decoding
+        if size is not None and size > self.MAX_BYTES:
+            return {"ok": False, "error": f"Video too large (> {self.MAX_BYTES} bytes)"}
         try:
-            data = b64_to_bytes(str(b64))
+            head = b64_peek(b64, self.HEAD_BYTES)
         except Exception as exc:
             return {"ok": False, "error": f"invalid base64: {exc}"}
-
-        size = len(data)
-        if size == 0:
+        if not head:
             return {"ok": False, "error": "empty file"}
-        if size > self.MAX_BYTES:
-            return {"ok": False, "error": f"Video too large (> {self.MAX_BYTES} bytes)"}
-
-        # Magic checks per extension
-        ok = False
-        if ext in (".mp4", ".mov"):
-            ok = self._has_ftyp(data) and (
-                self._mp4_brand_ok(data) if ext == ".mp4" else self._mov_brand_ok(data)
-            )
-        elif ext in (".mkv", ".webm"):
-            if self._is_ebml(data):
-                dt = self._ebml_doctype(data)
-                ok = (ext == ".mkv" and dt == "matroska") or (ext == ".webm" and dt == "webm")
-        elif ext == ".avi":
-            ok = self._is_avi(data)
-
-        if not ok:
+        if not self._magic_ok(ext, head):
             return {"ok": False, "error": f"invalid or unsupported {ext} content"}
 
-        subdir = ym_subdir(self.ROOT)
-        sha = sha256_hex(data)
-        path = subdir / f"{sha[:16]}{ext}"
-        if not path.exists():
-            path.write_bytes(data)
+        # decode -> sha256 -> disk in one streaming pass; never holds the decoded video
+        try:
+            path, size, sha = save_b64(b64, self.ROOT, ext, self.MAX_BYTES)
+        except PayloadTooLarge:
+            return {"ok": False, "error": f"Video too large (> {self.MAX_BYTES} bytes)"}
+        except (ValueError, binascii.Error) as exc:  # disk errors (OSError) propagate
+            return {"ok": False, "error": f"invalid base64: {exc}"}
 
         rel_path = str(path.relative_to(UPLOADS_ROOT)).replace("\\", "/")
         mime = self.MIME_MAP[ext]
@@ -1,2 +1,5 @@
-from .service import Service
+# Path from repo root: fastapi\app\services\whisper\__init__.py
+from app.services._lazy import lazy_service
+
 __all__ = ["Service"]
+__getattr__ = lazy_service(__name__, tasks=False)
@@ -1,9 +1,9 @@
 # Path from repo root: fastapi\app\workflows\registry.py
 from __future__ import annotations
 
-import json
 from pathlib import Path
 
+import orjson
 from pydantic import BaseModel, field_validator
 
 
@@ -41,13 +41,14 @@ def load_all(root: Path | None = None) -> None:
     _REGISTRY.clear()
 
     for m in root.glob("*/manifest.json"):
+        raw = m.read_bytes()
         try:
-            manifest = WorkflowManifest.model_validate_json(m.read_text(encoding="utf-8"))
+            manifest = WorkflowManifest.model_validate_json(raw)
         except Exception:
-            manifest = WorkflowManifest.model_validate(json.loads(m.read_text(encoding="utf-8")))
+            manifest = WorkflowManifest.model_validate(orjson.loads(raw))
         wf_dir = m.parent
         seq_path = wf_dir / manifest.sequence_file
-        sequence = json.loads(seq_path.read_text(encoding="utf-8"))
+        sequence = orjson.loads(seq_path.read_bytes())
         _REGISTRY[manifest.name] = WorkflowSpec(manifest=manifest, sequence=sequence)
     _LOADED = True
 
@@ -1,8 +1,14 @@
 # Path from repo root: fastapi\tests\conftest.py
 import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from starlette.testclient import TestClient
 
+from app.core.security import create_access_token
+from app.db import get_db
 from app.main import app
+from app.models.user import Base
 
 
 @pytest.fixture(scope="module")
@@ -14,6 +20,37 @@ def test_client():
         yield client
 
 
+@pytest.fixture
+def session_factory():
+    """Sessions on a fresh in-memory SQLite database with every table created."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine, expire_on_commit=False)
+    engine.dispose()
+
+
+@pytest.fixture
+def client(session_factory):
+    """Anonymous client whose get_db is backed by `session_factory`."""
+    def _get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = _get_db
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+
+
+@pytest.fixture
+def admin_client(client):
+    """`client` with an admin bearer token."""
+    client.headers["Authorization"] = f"Bearer {create_access_token(sub='0', roles=['admin'])}"
+    return client
+
+
 def pytest_collection_modifyitems(config, items):
     """
     Automatically skip gpu_cuda/gpu_mps tests if the hardware is not available.
@@ -0,0 +1,100 @@
+# Path from repo root: fastapi\tests\test_crud_users.py
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.crud import users as crud_users
+from app.models.user import Base, Role, User, UserRole
+from app.schemas.users import UserCreate, UserUpdate
+
+
+@pytest.fixture
+def db():
+    """Session on a throwaway in-memory database with the user tables."""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, expire_on_commit=False)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _count_queries(session):
+    statements = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *a: statements.append(a[2]))
+    return statements
+
+
+def test_list_users_loads_roles_without_n_plus_one(db):
+    editor = Role(name="editor")
+    db.add(editor)
+    for i in range(5):
+        db.add(User(username=f"user{i}", password_hash="x", roles=[UserRole(role=editor)]))
+    db.commit()
+    db.expunge_all()
+
+    statements = _count_queries(db)
+    users = crud_users.list_users(db)
+    assert [[ur.role.name for ur in u.roles] for u in users] == [["editor"]] * 5
+    assert len(statements) == 3  # users page + user_roles IN + roles IN
+
+
+def test_update_user_email_conflict_raises_value_error(db):
+    db.add_all([User(username="amy", email="amy@example.com", password_hash="x"),
+                User(username="ben", email="ben@example.com", password_hash="x")])
+    db.commit()
+    ben = crud_users.get_by_username(db, "ben")
+    with pytest.raises(ValueError):
+        crud_users.update_user(db, ben, UserUpdate(email="amy@example.com"))
+    assert crud_users.get_by_username(db, "ben").email == "ben@example.com"
+
+
+def test_create_user_reports_which_field_conflicts(db):
+    statements = _count_queries(db)
+    crud_users.create_user(db, UserCreate(username="dup", email="d@x.io", password="pw123456"))
+    assert statements[0].lstrip().startswith("INSERT")  # no pre-check SELECT
+    with pytest.raises(ValueError, match="Username"):
+        crud_users.create_user(db, UserCreate(username="dup", password="pw123456"))
+    with pytest.raises(ValueError, match="Email"):
+        crud_users.create_user(db, UserCreate(username="other", email="d@x.io", password="pw123456"))
+
+
+def test_list_users_search_matches_username_or_email_literally(db):
+    db.add_all([User(username="alice", email="a@corp.io", password_hash="x"),
+                User(username="bob_smith", email="bob@home.io", password_hash="x"),
+                User(username="bobsmith", email="b2@home.io", password_hash="x")])
+    db.commit()
+    assert [u.username for u in crud_users.list_users(db, q="CORP")] == ["alice"]
+    assert [u.username for u in crud_users.list_users(db, q="bob_")] == ["bob_smith"]
+
+
+def test_authenticate_uses_verify_cache(db):
+    from app.core import security
+
+    db.add(User(username="cat", password_hash=security.hash_password("pw123456")))
+    db.commit()
+    security._VERIFY_CACHE.clear()
+    assert crud_users.authenticate(db, "cat", "pw123456") is not None
+    assert len(security._VERIFY_CACHE) == 1
+    assert crud_users.authenticate(db, "cat", "wrong") is None
+    assert crud_users.authenticate(db, "nobody", "pw123456") is None
+
+
+def test_get_by_username_memoizes_within_session(db):
+    db.add(User(username="memo", password_hash="x"))
+    db.commit()
+    first = crud_users.get_by_username(db, "memo")
+    statements = _count_queries(db)
+    assert crud_users.get_by_username(db, "memo") is first
+    assert statements == []
+    first.username = "renamed"
+    db.commit()
+    assert crud_users.get_by_username(db, "memo") is None
+
+
+def test_update_user_issues_no_reload_select(db):
+    u = crud_users.create_user(db, UserCreate(username="upd", password="pw123456"))
+    statements = _count_queries(db)
+    crud_users.update_user(db, u, UserUpdate(email="upd@x.io"))
+    assert [s.split()[0] for s in statements] == ["UPDATE"]
+    assert u.email == "upd@x.io" and u.created_at is not None
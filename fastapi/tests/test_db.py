@@ -0,0 +1,13 @@
+# Path from repo root: fastapi\tests\test_db.py
+from app import db as app_db
+
+
+def test_sqlite_pragmas(tmp_path):
+    import sqlite3
+
+    conn = sqlite3.connect(tmp_path / "t.sqlite3")
+    app_db._sqlite_pragmas(conn)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+    conn.close()
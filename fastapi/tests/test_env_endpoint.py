@@ -24,4 +24,41 @@ def test_env_endpoint(env, expect):
     if expect[1] == 403:
       assert c.get("/env", headers={"X-Admin-Token":"supersecret"}).status_code == 200
     assert c.get("/docs").status_code == expect[2]
-    assert c.get("/redoc").status_code == expect[3]
\ No newline at end of file
+    assert c.get("/redoc").status_code == expect[3]
+
+
+def test_index_is_cached_with_etag():
+  from app.main import app
+  with TestClient(app) as c:
+    r = c.get("/")
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/html")
+    etag = r.headers["etag"]
+    assert c.get("/").content == r.content
+    assert c.get("/", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_request_ids_are_unique_and_echoed():
+  from app.main import app
+  with TestClient(app) as c:
+    a, b = c.get("/health").headers["x-request-id"], c.get("/health").headers["x-request-id"]
+    assert a != b and len(a) == len(b) == 32
+    assert c.get("/health", headers={"X-Request-ID": "abc"}).headers["x-request-id"] == "abc"
+
+
+def test_openapi_json_is_cached_bytes():
+  from app.main import app
+  with TestClient(app) as c:
+    r = c.get("/openapi.json")
+    assert r.status_code == 200 and r.json()["paths"]
+    assert c.get("/openapi.json").content == r.content
+    assert c.get("/openapi.json", headers={"If-None-Match": r.headers["etag"]}).status_code == 304
+
+
+def test_favicon_served_from_memory_or_204():
+  from app import main
+  with TestClient(main.app) as c:
+    r = c.get("/favicon.ico")
+    if main._FAVICON is None:
+      assert r.status_code == 204
+    else:
+      assert r.content == main._FAVICON and r.headers["content-type"] == "image/x-icon"
@@ -0,0 +1,61 @@
+# Path from repo root: fastapi\tests\test_model_pool.py
+import importlib
+import sys
+import time
+import types
+
+import pytest
+from starlette.testclient import TestClient
+
+
+@pytest.fixture
+def model_pool(monkeypatch):
+    """app.runtime.model_pool imported against a CPU-only torch stub (torch isn't needed here)."""
+    torch = types.SimpleNamespace(cuda=types.SimpleNamespace(is_available=lambda: False))
+    monkeypatch.setitem(sys.modules, "torch", torch)
+    monkeypatch.delitem(sys.modules, "app.runtime.model_pool", raising=False)
+    mod = importlib.import_module("app.runtime.model_pool")
+    yield mod
+    mod.get_model_pool.cache_clear()
+    sys.modules.pop("app.runtime.model_pool", None)
+
+
+def test_next_idle_deadline_tracks_oldest_model(model_pool, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(model_pool.time, "time", lambda: now[0])
+    pool = model_pool.ModelPool(max_active=2, idle_unload_s=60)
+    assert pool.next_idle_deadline() is None  # nothing loaded
+
+    pool.get("a", object)
+    now[0] += 10
+    pool.get("b", object)
+    assert pool.next_idle_deadline() == 60 - 10 + 1.0  # "a" expires first, plus 1 s slack
+    now[0] += 100
+    assert pool.next_idle_deadline() == 1.0  # already overdue: sweep right away
+
+    assert model_pool.ModelPool(idle_unload_s=0).next_idle_deadline() is None  # unloading disabled
+
+
+def test_on_load_fires_only_for_new_models(model_pool):
+    pool = model_pool.ModelPool()
+    loads = []
+    pool.on_load(lambda: loads.append(1))
+    pool.get("a", object)
+    pool.get("a", object)
+    assert loads == [1]
+    pool.on_load(None)
+    pool.get("b", object)
+    assert loads == [1]
+
+
+def test_sweeper_unloads_idle_model_after_a_load_wakes_it(model_pool):
+    from app.main import app
+
+    with TestClient(app):
+        pool = model_pool.get_model_pool()
+        pool.idle_unload_s = 0.05
+        pool.get("m", object)  # wakes the sleeping sweeper, which re-plans to ~1 s
+        deadline = time.monotonic() + 5
+        while pool.pool and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert not pool.pool
@@ -0,0 +1,37 @@
+# Path from repo root: fastapi\tests\test_plugins.py
+import pytest
+
+from app.plugins.dummy.plugin import Plugin
+
+
+def test_task_lookup_binds_service_method_once():
+    plugin = Plugin()
+    ping = plugin.ping
+    assert ping({}) == {"ok": True, "pong": True}
+    assert "ping" in vars(plugin)  # cached: later lookups skip __getattr__
+    assert plugin.ping == ping
+
+
+def test_unknown_attribute_does_not_load_service():
+    plugin = Plugin()
+    with pytest.raises(AttributeError):
+        plugin.not_a_task
+    assert plugin._impl is None
+
+
+def test_load_runs_once(monkeypatch):
+    plugin = Plugin()
+    plugin.load()
+    impl = plugin._impl
+    monkeypatch.setattr("importlib.import_module", lambda *a: pytest.fail("re-imported"))
+    plugin.load()
+    assert plugin._impl is impl
+
+
+def test_dummy_ping_routes_return_json(test_client):
+    r = test_client.post("/plugins/dummy/ping", json={})
+    assert r.status_code == 200
+    assert r.json()["result"] == {"ok": True, "pong": True}
+    r = test_client.post("/services/dummy/ping", json={})
+    assert r.status_code == 200
+    assert r.json() == {"ok": True, "pong": True}
@@ -0,0 +1,29 @@
+# Path from repo root: fastapi\tests\test_routes_auth.py
+from passlib.hash import bcrypt
+
+from app.core.security import decode_token
+from app.models.user import Role, User, UserRole
+
+
+def test_login_upgrades_legacy_bcrypt_hash(client, session_factory):
+    with session_factory() as db:
+        user = User(username="bob", password_hash=bcrypt.using(rounds=4).hash("pw123456"),
+                    roles=[UserRole(role=Role(name="editor"))])
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+    r = client.post("/auth/login", json={"username": "Bob", "password": "pw123456"})
+    assert r.status_code == 200
+    assert decode_token(r.json()["access_token"])["roles"] == ["editor"]
+    with session_factory() as db:
+        assert db.get(User, user_id).password_hash.startswith("scrypt$")
+
+    assert client.post("/auth/login", json={"username": "bob", "password": "pw123456"}).status_code == 200
+    assert client.post("/auth/login", json={"username": "bob", "password": "nope"}).status_code == 401
+    assert client.post("/auth/login", json={"username": "nobody", "password": "x"}).status_code == 401
+
+
+def test_login_body_is_strict(client):
+    assert client.post("/auth/login", json={"username": 123, "password": "pw123456"}).status_code == 422
+    assert client.post("/auth/login", json={"username": "bob", "password": "x", "admin": True}).status_code == 422
@@ -0,0 +1,83 @@
+# Path from repo root: fastapi\tests\test_routes_users.py
+from sqlalchemy import select
+
+from app.models.user import Role, User, UserRole
+
+
+def test_create_user_links_existing_and_new_roles(admin_client, session_factory):
+    with session_factory() as db:
+        db.add(Role(name="editor"))
+        db.commit()
+
+    r = admin_client.post("/users", json={"username": "ann", "password": "pw123456",
+                                    "roles": ["editor", "viewer", "editor"]})
+    assert r.status_code == 200
+
+    with session_factory() as db:
+        assert sorted(db.scalars(select(Role.name))) == ["editor", "viewer"]
+        linked = db.scalars(
+            select(Role.name).join(UserRole, UserRole.role_id == Role.id)
+            .join(User, User.id == UserRole.user_id).where(User.username == "ann")
+        )
+        assert sorted(linked) == ["editor", "viewer"]
+
+
+def test_create_user_rejects_duplicate_username_or_email(admin_client):
+    body = {"username": "bob", "email": "bob@example.com", "password": "pw123456"}
+    assert admin_client.post("/users", json=body).status_code == 200
+    r = admin_client.post("/users", json={**body, "email": "other@example.com"})
+    assert (r.status_code, r.json()["message"]) == (409, "username exists")
+    r = admin_client.post("/users", json={**body, "username": "bobby"})
+    assert (r.status_code, r.json()["message"]) == (409, "email exists")
+
+
+def test_create_user_normalizes_username(admin_client):
+    r = admin_client.post("/users", json={"username": "  Carol ", "password": "pw123456"})
+    assert r.json()["username"] == "carol"
+    r = admin_client.post("/users", json={"username": "CAROL", "password": "pw123456"})
+    assert r.status_code == 409
+
+
+def test_create_user_blocked_by_legacy_mixed_case_row(admin_client, session_factory):
+    with session_factory() as db:
+        db.add(User(username="Alice", password_hash="x"))  # stored before normalization
+        db.commit()
+    r = admin_client.post("/users", json={"username": "alice", "password": "pw123456"})
+    assert (r.status_code, r.json()["message"]) == (409, "username exists")
+
+
+def test_list_users_includes_role_names(admin_client):
+    admin_client.post("/users", json={"username": "dave", "password": "pw123456", "roles": ["editor"]})
+    admin_client.post("/users", json={"username": "erin", "password": "pw123456"})
+    r = admin_client.get("/users")
+    assert r.status_code == 200
+    assert [(u["username"], u["roles"]) for u in r.json()["items"]] == [("dave", ["editor"]), ("erin", [])]
+
+
+def test_list_users_keyset_pages(admin_client):
+    for name in ("usr1", "usr2", "usr3"):
+        admin_client.post("/users", json={"username": name, "password": "pw123456"})
+    first = admin_client.get("/users", params={"limit": 2}).json()
+    assert [u["username"] for u in first["items"]] == ["usr1", "usr2"]
+    second = admin_client.get("/users", params={"limit": 2, "after_id": first["next_after"]}).json()
+    assert [u["username"] for u in second["items"]] == ["usr3"]
+    assert second["next_after"] is None
+
+
+def test_export_streams_ndjson(admin_client):
+    import json
+
+    admin_client.post("/users", json={"username": "fay", "password": "pw123456", "roles": ["editor"]})
+    admin_client.post("/users", json={"username": "gus", "password": "pw123456"})
+    r = admin_client.get("/users/export")
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [(u["username"], u["roles"]) for u in rows] == [("fay", ["editor"]), ("gus", [])]
+
+
+def test_create_user_body_is_strict(admin_client):
+    body = {"username": "hank", "password": "pw123456"}
+    assert admin_client.post("/users", json={**body, "username": 12345}).status_code == 422
+    assert admin_client.post("/users", json={**body, "admin": True}).status_code == 422
+    assert admin_client.post("/users", json={**body, "password": "short"}).status_code == 422
+    assert admin_client.post("/users", json=body).status_code == 200
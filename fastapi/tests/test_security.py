@@ -0,0 +1,128 @@
+# Path from repo root: fastapi\tests\test_security.py
+import jwt
+import pytest
+
+from app.core import jwt_fast, security
+
+
+def test_access_token_roundtrip():
+    token = security.create_access_token(sub="1", roles=["editor"])
+    payload = security.decode_token(token)
+    assert payload["sub"] == "1"
+    assert payload["roles"] == ["editor"]
+
+
+def test_decode_rejects_tampered_and_expired_tokens():
+    token = security.create_access_token(sub="1", roles=["editor"])
+    header, payload, sig = token.split(".")
+    forged = security._encode({"sub": "1", "roles": ["admin"]}).split(".")[1]
+    with pytest.raises(jwt.InvalidSignatureError):
+        security.decode_token(f"{header}.{forged}.{sig}")
+    with pytest.raises(jwt.DecodeError):
+        security.decode_token("not-a-token")
+    with pytest.raises(jwt.ExpiredSignatureError):
+        security.decode_token(security._encode({"sub": "1", "exp": 1}))
+
+
+def test_jwt_fast_is_interchangeable_with_pyjwt():
+    key = b"k" * 32
+    claims = {"sub": "1", "roles": ["editor"], "exp": 4102444800}
+    assert jwt.decode(jwt_fast.encode(claims, key), key, algorithms=["HS256"]) == claims
+    assert jwt_fast.decode(jwt.encode(claims, key, algorithm="HS256"), key) == claims
+    with pytest.raises(jwt.InvalidAlgorithmError):
+        jwt_fast.decode(jwt.encode(claims, key, algorithm="HS512"), key)
+    with pytest.raises(jwt.ImmatureSignatureError):
+        jwt_fast.decode(jwt_fast.encode({"nbf": 4102444800}, key), key)
+
+
+def test_sign_keys_loaded_once():
+    security._load_sign_keys.cache_clear()
+    security.create_access_token(sub="1", roles=[])
+    security.create_refresh_token(sub="1")
+    assert security._load_sign_keys.cache_info().misses == 1
+
+
+def test_verify_cache_only_remembers_success(monkeypatch):
+    calls = []
+
+    def fake_verify(plain, stored):
+        calls.append(plain)
+        return plain == "right"
+
+    from passlib.hash import bcrypt
+
+    monkeypatch.setattr(bcrypt, "verify", fake_verify)
+    security._VERIFY_CACHE.clear()
+    assert security.verify_password_cached("right", "$2b$stored")
+    assert security.verify_password_cached("right", "$2b$stored")
+    assert not security.verify_password_cached("wrong", "$2b$stored")
+    assert not security.verify_password_cached("wrong", "$2b$stored")
+    assert calls == ["right", "wrong", "wrong"]
+
+
+def test_scrypt_hash_roundtrip():
+    stored = security.hash_password("s3cret")
+    assert stored.startswith("scrypt$")
+    assert security.verify_password("s3cret", stored)
+    assert not security.verify_password("wrong", stored)
+    assert not security.needs_rehash(stored)
+
+
+def test_legacy_bcrypt_needs_rehash():
+    assert security.needs_rehash("$2b$12$" + "a" * 53)
+
+
+def test_unknown_hash_format_runs_dummy_kdf(monkeypatch):
+    calls = []
+    real = security._verify_scrypt
+    monkeypatch.setattr(security, "_verify_scrypt", lambda p, e: calls.append(e) or real(p, e))
+    assert not security.verify_password("pw", "plaintext-password")
+    assert not security.verify_password("pw", None)
+    assert len(calls) == 2
+
+
+def test_refresh_token_hash_is_keyed_and_stable():
+    digest = security.hash_refresh_token("tok")
+    assert digest == security.hash_refresh_token("tok")
+    assert digest != security.hash_refresh_token("tok2")
+    assert len(digest) == 64
+
+
+def test_old_dklen_hash_verifies_and_needs_rehash():
+    salt = b"0123456789abcdef"
+    key = security._scrypt("pw", salt, security.SCRYPT_N, security.SCRYPT_R, security.SCRYPT_P, 64)
+    stored = f"{security._SCRYPT_PREFIX}{security._b64e(salt)}${security._b64e(key)}"
+    assert security.verify_password("pw", stored)
+    assert security.needs_rehash(stored)
+    assert not security.needs_rehash(security.hash_password("pw"))
+
+
+def test_parse_scrypt_default_and_custom_params():
+    stored = security.hash_password("pw")
+    n, r, p, salt, key = security._parse_scrypt(stored)
+    assert (n, r, p) == (security.SCRYPT_N, security.SCRYPT_R, security.SCRYPT_P)
+    assert len(salt) == security.SCRYPT_SALT_LEN and len(key) == security.SCRYPT_DKLEN
+    custom = stored.replace(f"${security.SCRYPT_N}$", "$1024$", 1)
+    assert security._parse_scrypt(custom)[:3] == (1024, security.SCRYPT_R, security.SCRYPT_P)
+    hits = security._parse_scrypt.cache_info().hits
+    security._parse_scrypt(stored)
+    assert security._parse_scrypt.cache_info().hits == hits + 1
+    for bad in ("scrypt$x", stored + "$extra", "bcrypt$1$2$3$a$b"):
+        with pytest.raises(ValueError):
+            security._parse_scrypt(bad)
+
+
+def test_kdf_process_pool(monkeypatch):
+    import asyncio
+
+    monkeypatch.setattr(security, "KDF_PROCESSES", 1)
+    try:
+        stored = asyncio.run(security.hash_password_async("pw"))
+        assert security._KDF_POOL is not None
+        security._VERIFY_CACHE.clear()
+        assert asyncio.run(security.verify_password_async("pw", stored))
+        assert not asyncio.run(security.verify_password_async("nope", stored))
+        assert len(security._VERIFY_CACHE) == 1
+    finally:
+        security.shutdown_kdf_pool()
+    assert security._KDF_POOL is None
@@ -0,0 +1,57 @@
+# Path from repo root: fastapi\tests\test_upload_utils.py
+import base64
+import hashlib
+import os
+import shutil
+
+import pytest
+
+from app.services import _utils_upload as uu
+
+
+@pytest.mark.parametrize("wrap", [base64.b64encode, base64.encodebytes])
+def test_decode_hash_write_streams_in_chunks(tmp_path, monkeypatch, wrap):
+    monkeypatch.setattr(uu, "B64_STREAM_CHUNK", 16)
+    data = os.urandom(1000)
+    b64 = "data:application/octet-stream;base64," + wrap(data).decode()
+    assert uu.b64_peek(b64, 10) == data[:12]
+    path, size, sha = uu.save_b64(b64, tmp_path, ".bin", 10_000)
+    assert path.read_bytes() == data
+    assert (size, sha) == (1000, hashlib.sha256(data).hexdigest())
+    assert path.name == f"{sha[:16]}.bin"
+
+
+def test_decode_hash_write_too_large_leaves_nothing(tmp_path):
+    tmp = tmp_path / "x.part"
+    assert uu.b64_size(base64.b64encode(b"x" * 100).decode()) == 100
+    with pytest.raises(uu.PayloadTooLarge):
+        uu.decode_hash_write(base64.b64encode(b"x" * 100).decode(), tmp, 50)
+    assert not tmp.exists()
+
+
+def test_decode_hash_write_skips_non_alphabet_chars(tmp_path, monkeypatch):
+    # a stray char early on must not shift the quanta of later chunks
+    monkeypatch.setattr(uu, "B64_STREAM_CHUNK", 16)
+    data = os.urandom(1000)
+    enc = base64.b64encode(data).decode()
+    b64 = enc[:5] + "!" + enc[5:]
+    assert base64.b64decode(b64) == data
+    size, sha = uu.decode_hash_write(b64, tmp_path / "x.part", 10_000)
+    assert (tmp_path / "x.part").read_bytes() == data
+    assert (size, sha) == (1000, hashlib.sha256(data).hexdigest())
+
+
+@pytest.mark.parametrize("sep", ["\r", " ", "\t", "\n"])
+def test_b64_size_unknown_with_whitespace(sep):
+    enc = base64.b64encode(b"x" * 300).decode()  # 400 chars
+    b64 = sep.join(enc[i:i + 76] for i in range(0, len(enc), 76)) + sep * 3
+    assert len(b64) % 4 == 0
+    assert uu.b64_size(b64) is None
+
+
+def test_save_b64_recreates_removed_month_dir(tmp_path):
+    b64 = base64.b64encode(b"hello").decode()
+    path, _, _ = uu.save_b64(b64, tmp_path, ".txt", 100)
+    shutil.rmtree(path.parent)  # e.g. a cleanup job while the process keeps its cache
+    path2, size, _ = uu.save_b64(b64, tmp_path, ".txt", 100)
+    assert path2 == path and path2.read_bytes() == b"hello" and size == 5
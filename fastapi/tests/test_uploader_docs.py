@@ -0,0 +1,69 @@
+# Path from repo root: fastapi\tests\test_uploader_docs.py
+import base64
+import io
+import os
+import zipfile
+
+import pytest
+
+from app.services.uploader_docs.service import Service, _zip_first_member, _zip_head_has_member
+
+ODT_MIME = b"application/vnd.oasis.opendocument.text"
+
+
+def _zip(*members, compression=zipfile.ZIP_DEFLATED) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, data, *stored in members:
+            zf.writestr(name, data, compress_type=zipfile.ZIP_STORED if stored else compression)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def upload(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # UPLOADS_ROOT is relative: uploads land in tmp_path
+    svc = Service()
+
+    def _upload(data: bytes, ext: str) -> dict:
+        return svc.upload_doc({"content_b64": base64.b64encode(data).decode(), "ext": ext})
+
+    return _upload
+
+
+def test_docx_is_recognized_from_the_head(upload):
+    docx = _zip(("[Content_Types].xml", b"<Types/>"), ("word/document.xml", b"<w:document/>"))
+    assert _zip_head_has_member(docx, b"word/document.xml")
+    r = upload(docx, ".docx")
+    assert r["ok"] and r["size"] == len(docx)
+
+
+def test_odt_mimetype_is_the_stored_first_member(upload):
+    odt = _zip(("mimetype", ODT_MIME, "stored"), ("content.xml", b"<office/>"))
+    assert _zip_first_member(odt) == (b"mimetype", 0, ODT_MIME)
+    assert upload(odt, ".odt")["ok"]
+
+
+def test_wrong_package_type_is_rejected(upload):
+    docx = _zip(("word/document.xml", b"<w:document/>"))
+    r = upload(docx, ".xlsx")
+    assert not r["ok"] and "invalid or corrupted .xlsx" in r["error"]
+    odt = _zip(("mimetype", ODT_MIME, "stored"))
+    assert not upload(odt, ".ods")["ok"]
+
+
+def test_member_past_the_head_falls_back_to_zipfile(upload):
+    # the OOXML part sits after 100 KB of incompressible data: not in the 64 KB head
+    docx = _zip(("media/blob.bin", os.urandom(100_000), "stored"), ("word/document.xml", b"<w:document/>"))
+    assert not _zip_head_has_member(docx[:Service.HEAD_BYTES], b"word/document.xml")
+    assert upload(docx, ".docx")["ok"]
+    assert not upload(docx, ".pptx")["ok"]
+
+
+def test_forged_local_file_header_passes_the_head_check(upload):
+    # known trade-off of the head-only check: a Local File Header naming the
+    # OOXML part is accepted without a central directory (ZipFile would refuse it)
+    name = b"word/document.xml"
+    forged = b"PK\x03\x04" + bytes(22) + len(name).to_bytes(2, "little") + bytes(2) + name + os.urandom(256)
+    with pytest.raises(zipfile.BadZipFile):
+        zipfile.ZipFile(io.BytesIO(forged))
+    assert upload(forged, ".docx")["ok"]
@@ -0,0 +1,94 @@
+# Path from repo root: fastapi\tests\test_uploads.py
+import hashlib
+import os
+
+import pytest
+from fastapi import HTTPException
+from starlette.testclient import TestClient
+
+from app.api import router_uploads
+from app.main import app
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Test client with uploads redirected to a temporary directory."""
+    monkeypatch.setattr(router_uploads, "UPLOAD_ROOT", tmp_path)
+    monkeypatch.setattr(router_uploads, "PARTIAL_ROOT", tmp_path / ".partial")
+    monkeypatch.setattr(router_uploads, "CAS_ROOT", tmp_path / ".cas")
+    return TestClient(app)
+
+
+def test_upload_streams_and_hashes(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(router_uploads, "CHUNK_SIZE", 4)
+    data = b"hello streaming world"
+    r = client.post("/uploads/", files={"file": ("note.txt", data, "text/plain")})
+    assert r.status_code == 201
+    body = r.json()
+    assert body["rel_path"] == "text/note.txt"
+    assert body["size_bytes"] == len(data)
+    assert body["sha256"] == hashlib.sha256(data).hexdigest()
+    assert (tmp_path / "text" / "note.txt").read_bytes() == data
+    assert not any((tmp_path / ".partial").iterdir())
+
+
+def test_identical_content_is_stored_once(client, tmp_path):
+    data = b"same bytes"
+    client.post("/uploads/", files={"file": ("one.txt", data, "text/plain")})
+    client.post("/uploads/", files={"file": ("two.txt", data, "text/plain")})
+    sha = hashlib.sha256(data).hexdigest()
+    cas = tmp_path / ".cas" / sha[:2] / sha
+    assert cas.read_bytes() == data
+    assert (tmp_path / "text" / "one.txt").stat().st_ino == cas.stat().st_ino
+    assert (tmp_path / "text" / "two.txt").stat().st_ino == cas.stat().st_ino
+    assert not any((tmp_path / ".partial").iterdir())
+
+
+def test_upload_rejects_oversize_without_leftovers(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(router_uploads, "MAX_BYTES", 0)
+    r = client.post("/uploads/", files={"file": ("big.bin", b"x", "application/octet-stream")})
+    assert r.status_code == 413
+    assert not (tmp_path / "other" / "big.bin").exists()
+    assert not any((tmp_path / ".partial").iterdir())
+
+
+def test_upload_rejects_empty(client):
+    r = client.post("/uploads/pdf", files={"file": ("empty.pdf", b"", "application/pdf")})
+    assert r.status_code == 400
+
+
+def test_list_reflects_new_uploads(client):
+    assert client.get("/uploads/text").json()["files"] == []
+    client.post("/uploads/", files={"file": ("a.txt", b"abc", "text/plain")})
+    files = client.get("/uploads/text").json()["files"]
+    assert files == [{"rel_path": "text/a.txt", "size_bytes": 3}]
+
+
+def test_safe_dst_stays_inside_root(tmp_path):
+    assert router_uploads._safe_dst(tmp_path, "../../etc/passwd") == tmp_path / "passwd"
+    with pytest.raises(HTTPException):
+        router_uploads._safe_dst(tmp_path, "..")
+
+
+def test_download_roundtrip_and_missing(client):
+    client.post("/uploads/", files={"file": ("b.txt", b"payload", "text/plain")})
+    r = client.get("/uploads/text/b.txt")
+    assert r.status_code == 200
+    assert r.content == b"payload"
+    assert client.get("/uploads/text/missing.txt").status_code == 404
+
+
+def test_save_text_does_not_write_through_shared_upload_links(tmp_path, monkeypatch):
+    from app.services.text_tools.service import Service
+
+    monkeypatch.chdir(tmp_path)
+    text_dir = tmp_path / "fastapi" / "uploads" / "text"
+    text_dir.mkdir(parents=True)
+    (text_dir / "a.txt").write_bytes(b"same")
+    os.link(text_dir / "a.txt", text_dir / "b.txt")  # as _place_by_digest leaves deduplicated uploads
+
+    svc = Service()
+    assert svc.save_text({"text": "+more", "rel_path": "text/a.txt", "append": True})["ok"]
+    assert svc.save_text({"text": "new", "rel_path": "text/b.txt"})["ok"]
+    assert (text_dir / "a.txt").read_bytes() == b"same+more"
+    assert (text_dir / "b.txt").read_bytes() == b"new"
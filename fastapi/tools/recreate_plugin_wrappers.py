@@ -23,29 +23,32 @@ from app.plugins.base import AIPlugin
 
 class Plugin(AIPlugin):
     name = "__NAME__"
-    tasks = __TASKS__
+    tasks: tuple[str, ...] = __TASKS__  # immutable; iteration / listing
+    _task_set: frozenset[str] = frozenset(tasks)  # O(1) membership
     provider = "local"
     _impl = None  # instance of app.services.__NAME__.service.Service
+    _loaded = False
 
     def __init__(self) -> None:
         self.name = "__NAME__"
-        # نثبت المهام المتولدة كقائمة قابلة للتعديل محليًا
-        self.tasks = list(__TASKS__)
 
     def load(self) -> None:
-        if self._impl is None:
-            mod = importlib.import_module("app.services.__NAME__.service")
-            Impl = getattr(mod, "Service", None) or getattr(mod, "Plugin", None)
-            if Impl is None:
-                raise ImportError("No Service/Plugin class found in service.py")
-            self._impl = Impl()
-            if hasattr(self._impl, "load"):
-                self._impl.load()
+        if self._loaded:  # warm path: one attribute test
+            return
+        mod = importlib.import_module("app.services.__NAME__.service")
+        Impl = getattr(mod, "Service", None) or getattr(mod, "Plugin", None)
+        if Impl is None:
+            raise ImportError("No Service/Plugin class found in service.py")
+        self._impl = Impl()
+        if hasattr(self._impl, "load"):
+            self._impl.load()
         # لو الملف المتولد ما فيه مهام لأي سبب، حاول ورّثها من الـ Impl
-        if (not self.tasks) and self._impl is not None:
+        if not self.tasks:
             svc_tasks = getattr(self._impl, "tasks", [])
             if isinstance(svc_tasks, (list, tuple, set)):
-                self.tasks = list(svc_tasks)
+                self.tasks = tuple(svc_tasks)
+                self._task_set = frozenset(self.tasks)
+        self._loaded = True
 
     def infer(self, payload: dict[str, Any]) -> Any:
         self.load()
@@ -55,12 +58,14 @@ class Plugin(AIPlugin):
         raise AttributeError(f"Unknown task: {task!r}")
 
     def __getattr__(self, item: str):
-        self.load()
-        if item in self.tasks and hasattr(self._impl, item):
-            def _call(payload: dict[str, Any]):
-                self.load()
-                return getattr(self._impl, item)(payload)
-            return _call
+        # only reached when normal lookup misses: bind the service method once
+        # and cache it on the instance, so later lookups never come back here
+        if item in self._task_set:
+            self.load()
+            method = getattr(self._impl, item, None)
+            if method is not None:
+                setattr(self, item, method)
+                return method
         raise AttributeError(item)
 """.lstrip()
 
@@ -153,7 +158,7 @@ def recreate_one(name: str, *, force_empty: bool = False, verbose: bool = False)
     else:
         pdir.mkdir(parents=True, exist_ok=True)
 
-    code = WRAPPER_TEMPLATE.replace("__NAME__", name).replace("__TASKS__", repr(tasks))
+    code = WRAPPER_TEMPLATE.replace("__NAME__", name).replace("__TASKS__", repr(tuple(tasks)))
     write_text(p_py, code)
     write_text(p_init, "")
 